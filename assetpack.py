@@ -0,0 +1,173 @@
+"""Prebuilt pack of the game's sprites, already scaled and in the display's pixel format.
+
+Loading from the pack is a page-in of a memory-mapped file instead of a PNG
+decode and a rescale: every sprite is a Surface made straight on top of the
+mapping with pygame.image.frombuffer, without copying. The pack records the
+tile size, the pixel format and each source PNG's size and modification
+time, and load() rebuilds it whenever any of them no longer match.
+
+  python assetpack.py                  # build images/sprites.pack for 64 px tiles
+  python assetpack.py --tile-size 48
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import pygame
+
+MAGIC = b"OQDP"
+VERSION = 1
+PACK_PATH = "images/sprites.pack"
+
+HEADER = struct.Struct("<4sHHI4s")  # magic, version, tile size, entries, pixel format
+ENTRY = struct.Struct("<HqqHHqq")   # path length, source mtime (ns) and size, width, height, offset, length; then the path
+ALIGN = 64  # pixel data starts on a cache line
+
+# Every sprite the game loads, by the size it is drawn at
+TILE_IMAGES = (
+  "images/olive_seed.png", "images/olive_teen.png", "images/olive_adult.png",
+  "images/olive_adult_fruit.png", "images/olive_sick.png", "images/olive_dead.png",
+  "images/duck.png", "images/duck_water.png", "images/duck_remove.png",
+)
+INSECT_IMAGES = ("images/insect.png", "images/mutant_insect.png")
+INSECT_SIZE = 32
+
+
+def manifest(tile_size):
+  """(path, size) of every sprite to pack."""
+  return ([(path, (tile_size, tile_size)) for path in TILE_IMAGES] +
+          [(path, (INSECT_SIZE, INSECT_SIZE)) for path in INSECT_IMAGES])
+
+def pixel_format():
+  """frombuffer() name of the byte order convert_alpha() gives on this display, e.g. "BGRA"."""
+  surface = pygame.Surface((1, 1), pygame.SRCALPHA)
+  if pygame.display.get_surface() is not None:
+    surface = surface.convert_alpha()
+  name = ""
+  for byte in range(4):
+    shift = 8 * (byte if sys.byteorder == "little" else 3 - byte)
+    for channel, mask in zip("RGBA", surface.get_masks()):
+      if mask == 0xff << shift:
+        name += channel
+  return name if name in ("RGBA", "ARGB", "BGRA") else "RGBA"
+
+
+class AssetPack:
+  """A built pack, mapped read-only; get() makes its sprites without copying them."""
+
+  def __init__(self, path):
+    self.path = path
+    with open(path, "rb") as file:
+      self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    self.view = memoryview(self.map)
+    magic, version, self.tile_size, count, pixel_format = HEADER.unpack_from(self.map)
+    if magic != MAGIC or version != VERSION:
+      raise ValueError(f"{path} is not a version {VERSION} sprite pack")
+    self.format = pixel_format.decode()
+    self.entries = {}  # (path, size) -> (offset, length) of its pixels
+    self.sources = {}  # source path -> (mtime_ns, size) it was built from
+    offset = HEADER.size
+    for i in range(count):
+      path_length, mtime, source_size, width, height, data, length = ENTRY.unpack_from(self.map, offset)
+      offset += ENTRY.size
+      source = bytes(self.map[offset:offset + path_length]).decode()
+      offset += path_length
+      self.entries[(source, (width, height))] = (data, length)
+      self.sources[source] = (mtime, source_size)
+
+  def stale(self, tile_size):
+    """True if the pack was built for another tile size or display, or from older PNGs."""
+    if self.tile_size != tile_size or self.format != pixel_format():
+      return True
+    for source, built_from in self.sources.items():
+      try:
+        stat = os.stat(source)
+      except OSError:
+        return True
+      if (stat.st_mtime_ns, stat.st_size) != built_from:
+        return True
+    return not set(manifest(tile_size)) <= set(self.entries)
+
+  def get(self, path, size):
+    """The packed sprite for path at size, or None if it isn't in the pack."""
+    entry = self.entries.get((path, size))
+    if entry is None:
+      return None
+    offset, length = entry
+    return pygame.image.frombuffer(self.view[offset:offset + length], size, self.format)
+
+  def close(self):
+    # Only possible once no Surface made by get() is alive
+    self.view.release()
+    self.map.close()
+
+
+def decode(source, size, pixel_format):
+  """source decoded and scaled to size, as raw bytes in pixel_format. Needs no display, so it can run on a thread."""
+  image = pygame.image.load(source)
+  if image.get_size() != size:
+    image = pygame.transform.scale(image, size)
+  return pygame.image.tobytes(image, pixel_format)
+
+def write(path, tile_size, pixel_format, sprites):
+  """Write a pack of sprites, given as (source path, size, raw bytes) in pixel_format."""
+  # Pixel data goes after the index, each sprite aligned
+  offset = HEADER.size + sum(ENTRY.size + len(source.encode()) for source, size, blob in sprites)
+  offsets = []
+  for source, size, blob in sprites:
+    offset += -offset % ALIGN
+    offsets.append(offset)
+    offset += len(blob)
+
+  temporary = path + ".tmp"
+  with open(temporary, "wb") as file:
+    file.write(HEADER.pack(MAGIC, VERSION, tile_size, len(sprites), pixel_format.encode()))
+    for (source, (width, height), blob), data in zip(sprites, offsets):
+      stat = os.stat(source)
+      name = source.encode()
+      file.write(ENTRY.pack(len(name), stat.st_mtime_ns, stat.st_size, width, height, data, len(blob)) + name)
+    for (source, size, blob), data in zip(sprites, offsets):
+      file.write(b"\0" * (data - file.tell()))
+      file.write(blob)
+  os.replace(temporary, path)
+
+def build(path, tile_size):
+  """Decode and scale every sprite like AssetCache does, and write them to path."""
+  pixel = pixel_format()
+  write(path, tile_size, pixel, [(source, size, decode(source, size, pixel)) for source, size in manifest(tile_size)])
+
+def open_pack(path, tile_size):
+  """The pack at path if it exists and is up to date, else None."""
+  try:
+    pack = AssetPack(path)
+  except (OSError, ValueError, struct.error):
+    return None
+  if pack.stale(tile_size):
+    pack.close()
+    return None
+  return pack
+
+def load(path, tile_size):
+  """The pack at path, (re)built first if it is missing or out of date."""
+  pack = open_pack(path, tile_size)
+  if pack is None:
+    build(path, tile_size)
+    pack = AssetPack(path)
+  return pack
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Build the sprite pack.")
+  parser.add_argument("--tile-size", type=int, default=64)
+  parser.add_argument("--out", default=PACK_PATH)
+  args = parser.parse_args(argv)
+  os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+  pygame.display.init()
+  pygame.display.set_mode((1, 1))
+  build(args.out, args.tile_size)
+  print(f"wrote {args.out} ({os.path.getsize(args.out) // 1024} KB, {len(manifest(args.tile_size))} sprites)")
+
+
+if __name__ == "__main__":
+  main()
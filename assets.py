@@ -0,0 +1,215 @@
+import queue
+import threading
+import time
+import weakref
+import pygame
+import assetpack
+
+class AssetCache:
+  """Process-wide registry of decoded images, keyed by (path, size, alpha)."""
+
+  def __init__(self):
+    self.sources = {}  # (path, alpha) -> decoded surface at its original size
+    self.scaled = {}   # (path, size, alpha) -> surface shared by every entity
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    # Headless runs get blank placeholders instead of decoding anything
+    self.headless = False
+    # Prebuilt sprites, see use_pack()
+    self.pack = None
+    self.packed = 0
+
+  def _source(self, path, alpha):
+    key = (path, alpha)
+    image = self.sources.get(key)
+    if image is None:
+      image = pygame.image.load(path)
+      # convert() needs a display mode, so images loaded before set_mode stay as decoded
+      if pygame.display.get_surface() is not None:
+        image = image.convert_alpha() if alpha else image.convert()
+      self.sources[key] = image
+    return image
+
+  def load_image(self, path, size=None, alpha=True):
+    """Return the shared surface for path scaled to size, decoding it at most once."""
+    if size is not None:
+      size = (int(size[0]), int(size[1]))
+    key = (path, size, alpha)
+
+    image = self.scaled.get(key)
+    if image is not None:
+      self.hits += 1
+      return image
+
+    self.misses += 1
+    if self.headless:
+      image = pygame.Surface(size or (1, 1))
+      self.scaled[key] = image
+      return image
+    if self.pack is not None and alpha and size is not None:
+      image = self.pack.get(path, size)
+      if image is not None:
+        self.packed += 1
+        self.scaled[key] = image
+        return image
+    image = self._source(path, alpha)
+    if size is not None and image.get_size() != size:
+      image = pygame.transform.scale(image, size)
+    self.scaled[key] = image
+    return image
+
+  def add(self, path, size, image, alpha=True):
+    """Hand the cache a surface for (path, size) that was loaded some other way."""
+    self.scaled[(path, (int(size[0]), int(size[1])), alpha)] = image
+
+  def evict_unused(self):
+    """Drop scaled variants that no entity references any more."""
+    evicted = 0
+    for key in list(self.scaled):
+      ref = weakref.ref(self.scaled.pop(key))
+      image = ref()
+      if image is None:
+        evicted += 1
+      else:
+        self.scaled[key] = image
+    self.evictions += evicted
+    return evicted
+
+  def clear(self):
+    self.sources.clear()
+    self.scaled.clear()
+
+  def memory_bytes(self):
+    """Approximate pixel memory held by the cache (shared surfaces counted once)."""
+    seen = {}
+    for image in list(self.sources.values()) + list(self.scaled.values()):
+      seen[id(image)] = image
+    return sum(image.get_width() * image.get_height() * image.get_bytesize() for image in seen.values())
+
+  def stats(self):
+    return {
+      "hits": self.hits,
+      "misses": self.misses,
+      "packed": self.packed,
+      "evictions": self.evictions,
+      "sources": len(self.sources),
+      "variants": len(self.scaled),
+      "bytes": self.memory_bytes(),
+    }
+
+
+# Shared by the orchard, insects and the player
+cache = AssetCache()
+
+
+class BackgroundLoader:
+  """Gets every sprite of the game into the cache without stalling the frame loop.
+
+  A valid sprite pack is simply mapped. Otherwise a worker thread decodes and
+  scales the PNGs into raw bytes, and update(), called once per frame, turns
+  them into display-format surfaces for as long as its time budget allows. The
+  worker then writes a fresh pack for the next launch. The loader keeps the
+  surfaces alive so evict_unused() never drops them.
+  """
+
+  def __init__(self, tile_size, path=assetpack.PACK_PATH):
+    self.sprites = assetpack.manifest(tile_size)
+    self.total = len(self.sprites)
+    self.loaded = 0
+    self.surfaces = []
+    self.error = None  # first decode error; that sprite is left to load_image
+    pack = assetpack.open_pack(path, tile_size)
+    if pack is not None:
+      cache.pack = pack
+      self.surfaces = [cache.load_image(source, size) for source, size in self.sprites]
+      self.loaded = self.total
+      return
+    self.pixel_format = assetpack.pixel_format()
+    self.ready = queue.Queue()
+    threading.Thread(target=self._run, args=(path, tile_size), name="asset loader", daemon=True).start()
+
+  @property
+  def done(self):
+    return self.loaded == self.total
+
+  @property
+  def progress(self):
+    return self.loaded / self.total if self.total else 1.0
+
+  def _run(self, path, tile_size):
+    decoded = []
+    for source, size in self.sprites:
+      try:
+        data = assetpack.decode(source, size, self.pixel_format)
+      except (OSError, pygame.error) as error:
+        self.error = self.error or error
+        data = None
+      else:
+        decoded.append((source, size, data))
+      self.ready.put((source, size, data))
+    if len(decoded) == self.total:
+      try:
+        assetpack.write(path, tile_size, self.pixel_format, decoded)
+      except OSError:
+        pass  # no pack next time, nothing worse
+
+  def update(self, budget_ms=4):
+    """Convert decoded sprites on this (the display's) thread until budget_ms is used up."""
+    start = time.perf_counter()
+    while not self.done:
+      try:
+        source, size, data = self.ready.get_nowait()
+      except queue.Empty:
+        return
+      if data is not None:
+        surface = pygame.image.frombuffer(data, size, self.pixel_format).convert_alpha()
+        cache.add(source, size, surface)
+        self.surfaces.append(surface)
+      self.loaded += 1
+      if (time.perf_counter() - start) * 1000 >= budget_ms:
+        return
+
+def load_image(path, size=None, alpha=True):
+  return cache.load_image(path, size, alpha)
+
+def use_pack(tile_size, path=assetpack.PACK_PATH):
+  """Serve sprites from the prebuilt pack at path, building or refreshing it first if needed."""
+  try:
+    cache.pack = assetpack.load(path, tile_size)
+  except OSError:
+    cache.pack = None  # e.g. a read-only install: decode the PNGs as before
+  return cache.pack
+
+def set_headless(headless=True):
+  """Skip image decoding entirely, e.g. for simulations with no display."""
+  cache.headless = headless
+  cache.clear()
+
+
+# None is the TTF bundled with pygame itself: opening it never scans the system's fonts
+FONT_PATH = None
+_fonts = {}
+
+def load_font(size, bold=False):
+  """Shared Font of the bundled typeface, starting pygame's font module on first use."""
+  font = _fonts.get((size, bold))
+  if font is None:
+    if not pygame.font.get_init():
+      pygame.font.init()
+    font = pygame.font.Font(FONT_PATH, size)
+    font.set_bold(bold)
+    _fonts[(size, bold)] = font
+  return font
+
+
+class LazyFont:
+  """Stands in for a Font that is only opened the first time something is drawn with it."""
+
+  def __init__(self, size, bold=False):
+    self.point_size = size
+    self.bold = bold
+
+  def __getattr__(self, name):
+    # Read-through to the real Font (render, get_linesize...)
+    return getattr(load_font(self.point_size, self.bold), name)
@@ -0,0 +1,209 @@
+"""Monte Carlo balancing: play thousands of seeded, headless games over a grid of settings.
+
+Every combination of the --param values is played --games times with a
+scripted policy, spread over a process pool (one worker per core by
+default). Each game's settings and results go into a columnar .npz file,
+one array per column, and a summary per combination is printed:
+
+  python balance.py --param insect_spawn_delay=3000,5000,8000 --param total_time=60000,120000
+  python balance.py --policy lazy_farmer --games 500 --out lazy.npz
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+import assets
+import olive
+import weather
+from engine import GameState, Inputs
+from gameclock import STEP_MS
+from orchard import HEALTHY, DEAD
+from swarm import FLYING
+
+# Every tunable setting and its value in the game as shipped
+PARAMETERS = {
+  "insect_spawn_delay": 5000,
+  "mutant_insect_spawn_delay": 5000,
+  "total_time": 120000,
+  "weather_drift": weather.TEMPERATURE_DRIFT,
+  "optimal_weather": olive.OPTIMAL_WEATHER,
+  "fastest_infection": olive.FASTEST_INFECTION,
+  "slowest_infection": olive.SLOWEST_INFECTION,
+}
+RESULTS = ("score", "trees_planted", "trees_lost", "insects_spawned", "insects_killed")
+
+
+# Policies: made per game as POLICIES[name](seed), then called every frame as
+# policy(game, frame) to return that frame's Inputs
+
+class Farmer:
+  """Tends the four tiles around where it starts: plants, waters, harvests, protects, clears dead trees.
+
+  Every swat_every frames it also clicks at the insect closest to landing
+  (0 = never), like a person would: only once the insect has been on screen
+  for reaction frames, aiming up to aim_error pixels off. Its own generator,
+  seeded per game, keeps the game's random draws untouched.
+  """
+
+  FACING = ((pygame.K_d, (1, 0)), (pygame.K_s, (0, 1)), (pygame.K_a, (-1, 0)), (pygame.K_w, (0, -1)))
+
+  def __init__(self, seed=0, swat_every=40, reaction=(30, 120), aim_error=32):
+    self.rng = random.Random(seed)
+    self.swat_every = swat_every
+    self.reaction = reaction  # frames an insect must be on screen before a swat, drawn per insect
+    self.aim_error = aim_error
+    self.noticed = {}  # insect id -> frame it can first be swatted
+    self.facing = 0
+
+  def swat(self, game, frame):
+    swarm = game.swarm
+    n = swarm.count
+    x = swarm.x[:n] + swarm.size / 2
+    y = swarm.y[:n] + swarm.size / 2
+    flying = np.flatnonzero((swarm.state[:n] == FLYING) & (x >= 0) & (x < game.width) & (y >= 0) & (y < game.height))
+    for id in swarm.ids[flying].tolist():
+      if id not in self.noticed:
+        self.noticed[id] = frame + self.rng.randint(*self.reaction)
+    flying = flying[[self.noticed[id] <= frame for id in swarm.ids[flying].tolist()]]
+    if len(flying) == 0:
+      return []
+    distance = np.hypot(swarm.target_x[flying] - swarm.x[flying], swarm.target_y[flying] - swarm.y[flying])
+    i = flying[np.argmin(distance)]
+    error = self.aim_error
+    return [(int(x[i]) + self.rng.randint(-error, error), int(y[i]) + self.rng.randint(-error, error))]
+
+  def __call__(self, game, frame):
+    clicks = self.swat(game, frame) if self.swat_every and frame % self.swat_every == 0 else []
+    player = game.player
+    if player.water_mode_start is not None or player.remove_mode_start is not None:
+      return Inputs(clicks=clicks)
+
+    size = game.tile_size
+    key, (dx, dy) = self.FACING[self.facing]
+    tile = (player.rect.centerx // size + dx, player.rect.centery // size + dy)
+    if player.selected_tile(size) != tile:
+      # One step towards it turns the player (and moves it 5 px, undone later in the cycle)
+      return Inputs([key], clicks=clicks)
+
+    orchard = game.orchard
+    slot = orchard.slot_at(tile)
+    action = None
+    if not (0 <= tile[0] < game.columns and 0 <= tile[1] < game.rows):
+      action = None
+    elif slot is None:
+      action = pygame.K_p
+    elif not orchard.growth_started[slot]:
+      action = pygame.K_o
+    elif orchard.status[slot] == DEAD:
+      action = pygame.K_r
+    elif orchard.fruit_ready[slot]:
+      action = pygame.K_SPACE
+    elif orchard.status[slot] != HEALTHY and not orchard.protected[slot] and game.protections:
+      action = pygame.K_l
+    if action is None:
+      self.facing = (self.facing + 1) % len(self.FACING)
+      return Inputs(clicks=clicks)
+    return Inputs(pressed=[action], clicks=clicks)
+
+POLICIES = {
+  "farmer": Farmer,
+  "lazy_farmer": lambda seed: Farmer(seed, swat_every=0),
+}
+
+
+def configure(params):
+  """Apply params (missing ones at their defaults) and return a GameState using them."""
+  params = dict(PARAMETERS, **params)
+  olive.OPTIMAL_WEATHER = params["optimal_weather"]
+  olive.FASTEST_INFECTION = params["fastest_infection"]
+  olive.SLOWEST_INFECTION = params["slowest_infection"]
+  weather.refresh_infection_rates()
+  game = GameState()
+  game.insect_spawn_delay = params["insect_spawn_delay"]
+  game.mutant_insect_spawn_delay = params["mutant_insect_spawn_delay"]
+  game.weather_drift = params["weather_drift"]
+  return game, params["total_time"]
+
+def play(game, total_time, policy, seed):
+  """One full round; returns its RESULTS."""
+  game.reset(seed=seed, total_time=total_time)
+  frame = 0
+  while not game.game_over:
+    game.step(policy(game, frame), STEP_MS)
+    frame += 1
+  orchard = game.orchard
+  # Lost: planted this round but not standing alive at the end
+  alive = int(np.count_nonzero(orchard.status[:orchard.count] != DEAD))
+  return game.score, orchard.next_serial, orchard.next_serial - alive, game.swarm.next_id, game.insects_killed
+
+def play_batch(params, policy_name, seeds):
+  """Worker task: play one grid point for each seed; returns a row of RESULTS per game."""
+  assets.set_headless()
+  game, total_time = configure(params)
+  return [play(game, total_time, POLICIES[policy_name](seed), seed) for seed in seeds]
+
+
+def parse_param(text):
+  name, values = text.split("=", 1)
+  if name not in PARAMETERS:
+    raise argparse.ArgumentTypeError(f"unknown parameter {name!r} (one of {', '.join(PARAMETERS)})")
+  return name, [float(value) if "." in value else int(value) for value in values.split(",")]
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Monte Carlo balancing runs over a parameter grid.")
+  parser.add_argument("--param", type=parse_param, action="append", default=[],
+                      help="NAME=V1,V2,... (repeat for a grid); names: " + ", ".join(PARAMETERS))
+  parser.add_argument("--policy", choices=sorted(POLICIES), default="farmer")
+  parser.add_argument("--games", type=int, default=100, help="games per grid point")
+  parser.add_argument("--seed", type=int, default=0, help="first seed; every grid point plays the same seeds")
+  parser.add_argument("--workers", type=int, default=os.cpu_count())
+  parser.add_argument("--out", default="balance.npz")
+  args = parser.parse_args(argv)
+
+  names = [name for name, values in args.param]
+  points = [dict(zip(names, values)) for values in itertools.product(*(values for name, values in args.param))]
+  seeds = list(range(args.seed, args.seed + args.games))
+  # A few batches per worker per point keeps every core busy without paying for a task per game
+  batch = max(1, -(-len(seeds) * len(points) // (args.workers * 4)))
+  tasks = [(point, index, seeds[start:start + batch])
+           for point, index in zip(points, itertools.count()) for start in range(0, len(seeds), batch)]
+
+  columns = {name: [] for name in ["point", "seed"] + list(PARAMETERS) + list(RESULTS)}
+  start = time.perf_counter()
+  with ProcessPoolExecutor(args.workers) as pool:
+    futures = [pool.submit(play_batch, point, args.policy, batch_seeds) for point, index, batch_seeds in tasks]
+    for (point, index, batch_seeds), future in zip(tasks, futures):
+      for seed, row in zip(batch_seeds, future.result()):
+        columns["point"].append(index)
+        columns["seed"].append(seed)
+        for name, default in PARAMETERS.items():
+          columns[name].append(point.get(name, default))
+        for name, value in zip(RESULTS, row):
+          columns[name].append(value)
+  elapsed = time.perf_counter() - start
+
+  arrays = {name: np.array(values) for name, values in columns.items()}
+  np.savez_compressed(args.out, **arrays)
+
+  games = len(arrays["seed"])
+  print(f"{games} games in {elapsed:.1f} s on {args.workers} workers ({games / elapsed:.1f} games/s) -> {args.out}")
+  print(f"{'point':<40}{'score':>10}{'±':>8}{'lost':>7}{'killed':>8}")
+  for index, point in enumerate(points):
+    rows = arrays["point"] == index
+    label = ", ".join(f"{name}={value}" for name, value in point.items()) or "defaults"
+    print(f"{label:<40}{arrays['score'][rows].mean():10.0f}{arrays['score'][rows].std():8.0f}"
+          f"{arrays['trees_lost'][rows].mean():7.1f}{arrays['insects_killed'][rows].mean():8.1f}")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,256 @@
+"""Headless frame-time benchmarks.
+
+Runs named load scenarios against the real game classes with SDL's dummy
+video driver and fixed seeds, and reports frame times and memory:
+
+  python benchmark.py                              # every scenario
+  python benchmark.py bugs_5000 window_4k          # just these
+  python benchmark.py --save-baseline base.json    # record a baseline
+  python benchmark.py --baseline base.json         # exit 1 if slower than it
+
+A frame is one fixed 60 Hz simulation step plus drawing the game like main.py does.
+
+No baseline is checked in, because frame times depend on the machine. To
+check a change, save a baseline from the commit before it and compare on
+the same machine, with the same --frames/--warmup/--seed:
+
+  git stash && python benchmark.py --save-baseline /tmp/base.json
+  git stash pop && python benchmark.py --baseline /tmp/base.json
+
+Only mean_ms, p95_ms and peak_memory_mb are gated. A metric fails when it is
+over --tolerance (25% by default) worse than the baseline.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from map import TileType, Map
+from engine import GameState, Inputs, KeyState
+from insect import Insect
+from mutantInsect import MutantInsect
+from render import Renderer, SurfaceCache
+import gameclock
+
+BASE_WIDTH, BASE_HEIGHT = 960, 704
+TILE_SIZE = 64
+FRAME_MS = gameclock.STEP_MS
+WHITE = (255, 255, 255)
+BROWN = (139, 69, 19)
+
+
+class Scenario:
+  """One benchmark: setup(bench) prepares the round, frame(bench, i) makes frame i's input."""
+
+  def __init__(self, name, description, setup, frame=None, window=(BASE_WIDTH, BASE_HEIGHT), world=(15, 11)):
+    self.name = name
+    self.description = description
+    self.setup = setup
+    self.frame = frame or (lambda bench, i: Inputs())
+    self.window = window
+    self.world = world
+
+
+class Bench:
+  """A round of the game plus everything main.py would draw it with."""
+
+  def __init__(self, scenario, seed):
+    columns, rows = scenario.world
+    self.screen = pygame.display.set_mode(scenario.window)
+    self.renderer = Renderer(self.screen, (BASE_WIDTH, BASE_HEIGHT))
+    tiles = (np.add.outer(np.arange(rows), np.arange(columns)) % 2 == 0).astype(np.uint8)
+    self.map = Map(tiles, [TileType("dirt", (56, 102, 65), False),
+                           TileType("grass", (144, 238, 144), False)], TILE_SIZE)
+    self.game = GameState(columns, rows, TILE_SIZE, view_size=(BASE_WIDTH, BASE_HEIGHT))
+    self.game.reset(seed=seed)
+    self.rng = random.Random(seed)
+    self.font = pygame.font.Font(None, 28)
+    self.text_cache = SurfaceCache(256, on_evict=self.renderer.release_image)
+
+  def plant_all(self, water=True):
+    orchard = self.game.orchard
+    for y in range(self.game.rows):
+      for x in range(self.game.columns):
+        if orchard.plant((x, y), self.game.weather_temperature) and water:
+          orchard.start_growth(orchard.slot_at((x, y)))
+
+  def add_insects(self, count, mutant_share=0.5):
+    for i in range(count):
+      species = MutantInsect if self.rng.random() < mutant_share else Insect
+      self.game.swarm.add(self.game.new_insect(species))
+
+  def draw(self):
+    """The same passes as main.draw_game, without the dirty-rect bookkeeping."""
+    game = self.game
+    renderer = self.renderer
+    player = game.player
+    view = game.camera.rect
+    renderer.begin_frame()
+    renderer.set_offset(view.topleft)
+    self.map.draw(renderer, view)
+    game.orchard.draw_protection(renderer, BROWN, view)
+    player.draw_select_tile(renderer)
+    game.orchard.draw(renderer, player.rect.bottom, behind=True, view=view)
+    player.draw(renderer)
+    game.orchard.draw(renderer, player.rect.bottom, behind=False, view=view)
+    game.swarm.draw(renderer, view)
+    remaining = game.remaining_time()
+    for i, text in enumerate((f"Profit: {game.score}", f"{remaining // 60:02}:{remaining % 60:02}",
+                              f"Weather: {game.weather_temperature}°F")):
+      label = self.text_cache.render_text(self.font, text, WHITE)
+      renderer.blit(label, (view.x + 10 + i * 320, view.y + 10))
+    renderer.present()
+
+
+# Scenarios
+
+def churn_frame(bench, i):
+  # Plant on one random tile and dig up another, every frame
+  game = bench.game
+  tile = (bench.rng.randrange(game.columns), bench.rng.randrange(game.rows))
+  if game.plant(tile):
+    game.orchard.start_growth(game.orchard.slot_at(tile))
+  game.orchard.remove((bench.rng.randrange(game.columns), bench.rng.randrange(game.rows)))
+  return Inputs()
+
+def wander_frame(bench, i):
+  # Walk in a square, a second per side
+  return Inputs(KeyState([(pygame.K_d, pygame.K_s, pygame.K_a, pygame.K_w)[i // 60 % 4]]))
+
+def clicking_frame(bench, i):
+  return Inputs(clicks=[(bench.rng.randrange(BASE_WIDTH), bench.rng.randrange(BASE_HEIGHT))])
+
+SCENARIOS = [
+  Scenario("full_orchard", "every tile of the 15x11 orchard planted and growing",
+           lambda bench: bench.plant_all(), wander_frame),
+  Scenario("bugs_5000", "5,000 insects and mutants flying at a full orchard, clicked at every frame",
+           lambda bench: (bench.plant_all(), bench.add_insects(5000)), clicking_frame),
+  Scenario("plant_churn", "a tree planted and another removed every frame",
+           lambda bench: None, churn_frame),
+  Scenario("window_4k", "full orchard letterboxed into a 3840x2160 window",
+           lambda bench: bench.plant_all(), wander_frame, window=(3840, 2160)),
+  Scenario("big_world", "walking across a 1000x1000 world with 100,000 trees",
+           lambda bench: plant_scattered(bench, 100000), wander_frame, world=(1000, 1000)),
+]
+
+def plant_scattered(bench, count):
+  game = bench.game
+  for i in range(count):
+    tile = (bench.rng.randrange(game.columns), bench.rng.randrange(game.rows))
+    if game.orchard.plant(tile, game.weather_temperature):
+      game.orchard.start_growth(game.orchard.slot_at(tile))
+
+
+def percentile(sorted_values, fraction):
+  return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def run(scenario, frames, warmup, seed):
+  """Time frames of scenario; returns its results in ms and MB."""
+  bench = Bench(scenario, seed)
+  scenario.setup(bench)
+  for i in range(warmup):
+    bench.game.step(scenario.frame(bench, i), FRAME_MS)
+    bench.draw()
+
+  times = []
+  for i in range(warmup, warmup + frames):
+    start = time.perf_counter()
+    bench.game.step(scenario.frame(bench, i), FRAME_MS)
+    bench.draw()
+    times.append((time.perf_counter() - start) * 1000)
+
+  # Memory in a second, shorter pass: tracing slows everything down
+  bench = Bench(scenario, seed)
+  tracemalloc.start()
+  scenario.setup(bench)
+  for i in range(min(frames, 60)):
+    bench.game.step(scenario.frame(bench, i), FRAME_MS)
+    bench.draw()
+  current, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  times.sort()
+  return {
+    "frames": frames,
+    "mean_ms": sum(times) / len(times),
+    "p50_ms": percentile(times, 0.50),
+    "p95_ms": percentile(times, 0.95),
+    "p99_ms": percentile(times, 0.99),
+    "max_ms": times[-1],
+    "memory_mb": current / 2 ** 20,
+    "peak_memory_mb": peak / 2 ** 20,
+  }
+
+# Metrics compared against the baseline
+GATED = ("mean_ms", "p95_ms", "peak_memory_mb")
+
+def regressions(results, baseline, tolerance):
+  """(scenario, metric, baseline, result) for every gated metric worse than baseline by more than tolerance."""
+  found = []
+  for name, result in results.items():
+    for metric in GATED:
+      old = baseline.get(name, {}).get(metric)
+      if old is not None and result[metric] > old * (1 + tolerance):
+        found.append((name, metric, old, result[metric]))
+  return found
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Headless frame-time benchmarks.")
+  parser.add_argument("scenarios", nargs="*", help="scenario names (default: all)")
+  parser.add_argument("--frames", type=int, default=600)
+  parser.add_argument("--warmup", type=int, default=60)
+  parser.add_argument("--seed", type=int, default=1)
+  parser.add_argument("--json", help="write the results to this file")
+  parser.add_argument("--baseline", help="fail if results regress past this baseline file (saved on this machine)")
+  parser.add_argument("--save-baseline", help="write the results as the new baseline")
+  parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+  parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+  args = parser.parse_args(argv)
+
+  scenarios = {scenario.name: scenario for scenario in SCENARIOS}
+  if args.list:
+    for scenario in SCENARIOS:
+      print(f"{scenario.name:<14}{scenario.description}")
+    return 0
+  unknown = [name for name in args.scenarios if name not in scenarios]
+  if unknown:
+    parser.error("unknown scenario: " + ", ".join(unknown))
+
+  pygame.init()
+  results = {}
+  print(f"{'scenario':<14}{'mean':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}{'peak MB':>9}")
+  for name in args.scenarios or scenarios:
+    result = run(scenarios[name], args.frames, args.warmup, args.seed)
+    results[name] = result
+    print(f"{name:<14}{result['mean_ms']:8.2f}{result['p50_ms']:8.2f}{result['p95_ms']:8.2f}"
+          f"{result['p99_ms']:8.2f}{result['max_ms']:8.2f}{result['peak_memory_mb']:9.1f}")
+  pygame.quit()
+
+  for path in (args.json, args.save_baseline):
+    if path:
+      with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+  if args.baseline:
+    with open(args.baseline) as file:
+      baseline = json.load(file)
+    found = regressions(results, baseline, args.tolerance)
+    for name, metric, old, new in found:
+      print(f"REGRESSION {name} {metric}: {old:.2f} -> {new:.2f}")
+    if found:
+      return 1
+    print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,32 @@
+import pygame
+
+
+class Camera:
+  """The part of the world on screen, kept centred on the player and inside the world edges."""
+
+  def __init__(self, view_width, view_height, world_width, world_height):
+    self.world = pygame.Rect(0, 0, world_width, world_height)
+    self.rect = pygame.Rect(0, 0, min(view_width, world_width), min(view_height, world_height))
+
+  @property
+  def offset(self):
+    return self.rect.topleft
+
+  def covers_world(self):
+    """True when the whole world fits on screen (no scrolling, nothing off-screen)."""
+    return self.rect.size == self.world.size
+
+  def follow(self, target):
+    """Centre on target (a rect); returns True if the view moved."""
+    old = self.rect.topleft
+    self.rect.center = target.center
+    self.rect.clamp_ip(self.world)
+    return self.rect.topleft != old
+
+  def tiles(self, tile_size, margin=0):
+    """Tile range (left, top, right, bottom), exclusive at the far end, overlapping the view."""
+    rect = self.rect
+    return (max(0, rect.left // tile_size - margin),
+            max(0, rect.top // tile_size - margin),
+            min(self.world.width // tile_size, (rect.right - 1) // tile_size + 1 + margin),
+            min(self.world.height // tile_size, (rect.bottom - 1) // tile_size + 1 + margin))
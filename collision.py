@@ -0,0 +1,50 @@
+import pygame
+
+
+class CollisionGrid:
+  """One byte per map tile saying whether it blocks the player.
+
+  Trees set and clear their tile as they become solid or are removed, so a
+  collision query only ever looks at the handful of tiles around the player.
+  """
+
+  def __init__(self, columns, rows, tile_size):
+    self.columns = columns
+    self.rows = rows
+    self.tile_size = tile_size
+    self.cells = bytearray(columns * rows)
+
+  def _cell(self, tile):
+    x, y = tile
+    if 0 <= x < self.columns and 0 <= y < self.rows:
+      return y * self.columns + x
+    return None
+
+  def set_solid(self, tile, solid=True):
+    cell = self._cell(tile)
+    if cell is not None:
+      self.cells[cell] = solid
+
+  def clear(self, tile):
+    self.set_solid(tile, False)
+
+  def reset(self):
+    self.cells = bytearray(self.columns * self.rows)
+
+  def is_solid(self, tile):
+    cell = self._cell(tile)
+    return cell is not None and self.cells[cell] != 0
+
+  def blocked(self, point):
+    """True if the point (in pixels) lies on a solid tile."""
+    return self.is_solid((point[0] // self.tile_size, point[1] // self.tile_size))
+
+  def solid_rects(self, rect):
+    """Rects of the solid tiles overlapping rect, row by row."""
+    size = self.tile_size
+    rects = []
+    for y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+      for x in range(rect.left // size, (rect.right - 1) // size + 1):
+        if self.is_solid((x, y)):
+          rects.append(pygame.Rect(x * size, y * size, size, size))
+    return rects
@@ -0,0 +1,309 @@
+import random
+import numpy as np
+import pygame
+from player import Player
+from insect import Insect
+from mutantInsect import MutantInsect
+from swarm import InsectSwarm
+from orchard import Orchard
+from targets import TargetIndex
+from collision import CollisionGrid
+from camera import Camera
+from spread import DiseaseSpread
+from weather import Weather, TEMPERATURE_DRIFT
+import gameclock
+from profiler import span
+from scheduler import Scheduler, use_scheduler
+
+# Keys the game reacts to; the engine only needs the constants, not an initialised pygame
+PLANT_KEY = pygame.K_p
+WATER_KEY = pygame.K_o
+HARVEST_KEY = pygame.K_SPACE
+PROTECT_KEY = pygame.K_l
+REMOVE_KEY = pygame.K_r
+
+
+class KeyState(frozenset):
+  """Set of held keys that can stand in for pygame.key.get_pressed()."""
+
+  def __getitem__(self, key):
+    return key in self
+
+
+class Inputs:
+  """Everything the player did during one frame."""
+
+  def __init__(self, held=(), pressed=(), clicks=()):
+    self.held = held if isinstance(held, KeyState) else KeyState(held)
+    self.pressed = list(pressed)  # KEYDOWN keys, in order
+    self.clicks = list(clicks)    # mouse clicks in game coordinates
+
+
+class GameState:
+  """All state of one round, advanced by step() with no display or window required."""
+
+  def __init__(self, columns=15, rows=11, tile_size=64, clock=None, view_size=None, disease_spread=False):
+    self.columns = columns
+    self.rows = rows
+    self.tile_size = tile_size
+    self.width = columns * tile_size
+    self.height = rows * tile_size
+    # What is on screen; view_size defaults to the whole world
+    self.view_size = view_size or (self.width, self.height)
+    # Off-screen trees and insects are only simulated every lod_interval steps
+    self.lod_interval = 8
+    # Optional tree-to-tree spread of the infection, on top of the insects
+    self.disease_spread = disease_spread
+    self.spread_interval = 1000  # milliseconds
+
+    self.clock = clock or gameclock.SimClock()
+    # The engine runs every step it is given; the interactive loop caps catch-up itself
+    self.timestep = gameclock.FixedTimestep(max_steps=None)
+
+    self.insect_spawn_delay = 5000  # milliseconds
+    self.mutant_insect_spawn_delay = 5000
+    self.weather_update_interval = 10000  # 10 seconds in milliseconds
+    self.weather_drift = TEMPERATURE_DRIFT
+
+    self.reset()
+
+  def reset(self, seed=None, total_time=120000):
+    """Start a fresh round. A seed makes the round reproducible."""
+    gameclock.use_clock(self.clock)
+    # Every timed event of the round goes through one scheduler; the last round's never fire
+    if hasattr(self, "scheduler"):
+      self.scheduler.clear()
+    self.scheduler = Scheduler()
+    use_scheduler(self.scheduler)
+    if seed is not None:
+      random.seed(seed)
+
+    center_tile_x = self.columns // 2
+    center_tile_y = self.rows // 2
+    player_x = center_tile_x * self.tile_size
+    player_y = center_tile_y * self.tile_size
+    self.player = Player(player_x, player_y, self.tile_size, self.tile_size, self.width, self.height, self.tile_size)
+    self.camera = Camera(self.view_size[0], self.view_size[1], self.width, self.height)
+    self.camera.follow(self.player.rect)
+    self.steps = 0
+
+    # Every tree's lifecycle state, in parallel arrays keyed by tile
+    self.targets = TargetIndex(self.columns, self.rows, self.tile_size)
+    self.orchard = Orchard(self.tile_size, grid=CollisionGrid(self.columns, self.rows, self.tile_size),
+                           targets=self.targets)
+    # Both insect species, advanced together in NumPy arrays
+    self.swarm = InsectSwarm(self.width, self.height)
+    self.protections = 1
+    self.score = 0
+    self.insects_killed = 0
+    self.game_over = False
+
+    now = self.clock.get_ticks()
+    self.start_time = now
+    self.total_time = total_time  # 2 minutes in milliseconds
+    self.insect_spawn_timer = now  # time of the last spawn
+    self.mutant_insect_spawn_timer = now
+    self.spawns_waiting = []  # spawners that came due with nothing planted
+    # Trees only hear about the weather when the temperature actually changes
+    self.weather = Weather(self.weather_update_interval, now=now, drift=self.weather_drift)
+    self.weather.subscribe(self.on_weather_change)
+    self.timestep.reset()
+
+    self.scheduler.schedule(now + self.insect_spawn_delay, self.spawn_insect)
+    self.scheduler.schedule(now + self.mutant_insect_spawn_delay, self.spawn_mutant_insect)
+    self.scheduler.schedule(now + self.weather.interval, self.update_weather)
+
+    self.spread = None
+    if self.disease_spread:
+      self.spread = DiseaseSpread(self.orchard, self.columns, self.rows, self.spread_interval,
+                                  seed=random.getrandbits(32))
+      self.weather.subscribe(self.spread.on_weather_change)
+      self.scheduler.schedule(now + self.spread_interval, self.spread_disease)
+
+  @property
+  def weather_temperature(self):
+    return self.weather.temperature
+
+  def on_weather_change(self, temperature, infection_rate):
+    self.orchard.set_infection_rate(infection_rate)
+
+  def start(self):
+    """Restart the round timer (e.g. when PLAY is clicked after idling in the menu)."""
+    self.start_time = self.clock.get_ticks()
+
+  def remaining_time(self):
+    """Whole seconds left in the round."""
+    elapsed_time = self.clock.get_ticks() - self.start_time
+    return max(0, (self.total_time - elapsed_time) // 1000)
+
+  def handle_key(self, key):
+    """Apply a key press (P, O, SPACE, L or R) to the selected tile at the current time."""
+    player = self.player
+    if player.water_mode_start is not None or player.remove_mode_start is not None:
+      return
+    action = ACTIONS.get(key)
+    if action is not None:
+      action(self, player.selected_tile(self.tile_size))
+
+  # Tile actions: each resolves the tile to its tree with one index lookup
+
+  def plant(self, tile):
+    # Facing out from the world's edge selects a tile that isn't in it
+    if not (0 <= tile[0] < self.columns and 0 <= tile[1] < self.rows):
+      return False
+    planted = self.orchard.plant(tile, self.weather_temperature)
+    if planted:
+      # Spawners that found an empty orchard fire on the next step
+      for spawn in self.spawns_waiting:
+        self.scheduler.schedule(self.clock.get_ticks(), spawn)
+      self.spawns_waiting = []
+    return planted
+
+  def water(self, tile):
+    slot = self.orchard.slot_at(tile)
+    if slot is not None:
+      self.orchard.start_growth(slot)
+    self.player.activate_water_mode()
+
+  def harvest(self, tile):
+    slot = self.orchard.slot_at(tile)
+    if slot is not None and self.orchard.harvest(slot):
+      self.score += 100
+      return True
+    return False
+
+  def protect(self, tile):
+    slot = self.orchard.slot_at(tile)
+    if slot is not None and self.protections > 0:
+      self.orchard.protect(slot)
+      self.protections -= 1
+
+  def remove(self, tile):
+    if tile in self.orchard:
+      removal_time = self.clock.get_ticks() + 4000  # 4 seconds later
+      self.orchard.schedule_removal(removal_time, tile)
+    self.player.activate_remove_mode()
+
+  def new_insect(self, species=Insect):
+    """A freshly spawned insect of species, headed for a random watered, living tree (if any)."""
+    insect = species(self.width, self.height)
+    tile = self.targets.sample()
+    if tile is not None:
+      insect.target = self.orchard.view(tile)
+    return insect
+
+  def click(self, pos):
+    """Squash every insect under pos (game coordinates)."""
+    hits = self.swarm.hit(pos)
+    self.insects_killed += hits
+    return hits
+
+  # Scheduled events
+
+  def half_time(self):
+    """Remaining whole seconds at which insects give way to mutants."""
+    return self.total_time // (1000 * 2)
+
+  def spawn_insect(self):
+    """Spawn an insect every insect_spawn_delay during the first half of the round."""
+    if self.remaining_time() <= self.half_time():
+      return  # Insects are done for this round
+    if not self.orchard:
+      self.spawns_waiting.append(self.spawn_insect)
+      return
+    now = self.clock.get_ticks()
+    self.swarm.add(self.new_insect(Insect))
+    self.insect_spawn_timer = now
+    self.scheduler.schedule(now + self.insect_spawn_delay, self.spawn_insect)
+
+  def spawn_mutant_insect(self):
+    """Spawn a mutant every mutant_insect_spawn_delay once the second half starts."""
+    if self.remaining_time() >= self.half_time():
+      # Come back on the first millisecond of the second half
+      season = self.start_time + self.total_time - self.half_time() * 1000 + 1
+      self.scheduler.schedule(season, self.spawn_mutant_insect)
+      return
+    if not self.orchard:
+      self.spawns_waiting.append(self.spawn_mutant_insect)
+      return
+    now = self.clock.get_ticks()
+    self.swarm.add(self.new_insect(MutantInsect))
+    self.mutant_insect_spawn_timer = now
+    self.scheduler.schedule(now + self.mutant_insect_spawn_delay, self.spawn_mutant_insect)
+
+  def update_weather(self):
+    now = self.clock.get_ticks()
+    self.weather.update(now)
+    self.scheduler.schedule(now + self.weather.interval, self.update_weather)
+
+  def spread_disease(self):
+    now = self.clock.get_ticks()
+    self.spread.step(now)
+    self.scheduler.schedule(now + self.spread.interval, self.spread_disease)
+
+  def update(self, keys):
+    """Advance the game by one fixed step of gameclock.STEP_MS."""
+    self.clock.advance(self.timestep.step_ms)
+    if self.remaining_time() <= 0:
+      self.game_over = True
+      return
+    current_time = self.clock.get_ticks()
+
+    # Spawns, weather, removals, player modes, departures and trees turning solid
+    with span("events"):
+      self.scheduler.run_due(current_time)
+
+    with span("player"):
+      self.player.move(keys, self.orchard.grid)
+      self.camera.follow(self.player.rect)
+    self.steps += 1
+
+    whole_world = self.camera.covers_world()
+    with span("orchard"):
+      self.orchard.update(current_time, None if whole_world else self.lod_slots())
+    with span("insects"):
+      # Insects headed for trees that were removed or died this step pick the nearest other one
+      lost = self.targets.take_lost()
+      if lost:
+        self.swarm.retarget(lost, self.targets, self.orchard, current_time)
+      if whole_world:
+        self.swarm.update(current_time)
+      else:
+        self.swarm.update(current_time, self.camera.rect, self.lod_interval)
+
+  def lod_slots(self):
+    """Trees to update this step: everything on screen plus a rolling share of the rest."""
+    orchard = self.orchard
+    near = orchard.slots_in(self.camera.tiles(self.tile_size, margin=1))
+    batch = -(-orchard.count // self.lod_interval)
+    start = (self.steps % self.lod_interval) * batch
+    return np.union1d(near, np.arange(start, min(orchard.count, start + batch)))
+
+  def step(self, inputs, dt):
+    """Apply one frame of inputs, then simulate dt milliseconds in fixed steps."""
+    gameclock.use_clock(self.clock)
+    use_scheduler(self.scheduler)
+    if self.game_over:
+      return self
+
+    with span("actions"):
+      for key in inputs.pressed:
+        self.handle_key(key)
+      for pos in inputs.clicks:
+        self.click(pos)
+
+    for _ in range(self.timestep.advance(dt)):
+      self.update(inputs.held)
+      if self.game_over:
+        break
+    return self
+
+
+# What each key does to the selected tile
+ACTIONS = {
+  PLANT_KEY: GameState.plant,
+  WATER_KEY: GameState.water,
+  HARVEST_KEY: GameState.harvest,
+  PROTECT_KEY: GameState.protect,
+  REMOVE_KEY: GameState.remove,
+}
@@ -0,0 +1,72 @@
+import pygame
+
+# Length of one simulation step. Gameplay speeds (insects, player) are defined per step.
+STEP_MS = 1000 / 60
+
+class WallClock:
+  """Reads real time, like pygame.time.get_ticks()."""
+
+  def get_ticks(self):
+    return pygame.time.get_ticks()
+
+
+class SimClock:
+  """Simulation time that only moves when the game loop advances it."""
+
+  def __init__(self, start=0):
+    self.time = start  # milliseconds, kept as a float so fractional steps don't drift
+
+  def get_ticks(self):
+    return int(self.time)
+
+  def advance(self, ms=STEP_MS):
+    self.time += ms
+
+
+class FixedTimestep:
+  """Accumulates real frame time and hands it back as a whole number of simulation steps.
+
+  speed > 1 fast-forwards, and max_steps bounds how far a single frame may catch
+  up after a stall so a long hitch doesn't snowball into ever longer frames
+  (None never drops time, for headless runs).
+  """
+
+  def __init__(self, step_ms=STEP_MS, max_steps=15, speed=1.0):
+    self.step_ms = step_ms
+    self.max_steps = max_steps
+    self.speed = speed
+    self.accumulator = 0.0
+
+  def reset(self):
+    self.accumulator = 0.0
+
+  def advance(self, frame_ms):
+    """Add one frame's worth of real time and return how many steps are due."""
+    self.accumulator += frame_ms * self.speed
+    steps = int(self.accumulator // self.step_ms)
+    if self.max_steps is None:
+      self.accumulator -= steps * self.step_ms
+      return steps
+
+    limit = int(self.max_steps * max(1.0, self.speed))
+    if steps > limit:
+      # Drop the backlog we can't catch up on
+      steps = limit
+      self.accumulator = 0.0
+    else:
+      self.accumulator -= steps * self.step_ms
+    return steps
+
+
+# Every module reads time through get_ticks(); the game loop installs a SimClock.
+_clock = WallClock()
+
+def use_clock(clock):
+  global _clock
+  _clock = clock
+
+def get_clock():
+  return _clock
+
+def get_ticks():
+  return _clock.get_ticks()
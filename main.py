@@ -1,34 +1,87 @@
+"""Olive orchard game: the window, menus and main loop around the headless GameState in engine.py."""
+# Taken before the numpy/pygame imports below so --startup-timing counts them too
+import time
+STARTED = time.perf_counter()
+import atexit
+import random
 import sys
+import numpy as np
 import pygame
-from player import Player
 from map import TileType, Map
-from insect import Insect
-from mutantInsect import MutantInsect
-import random
-
-pygame.init()
-
-# Grid dimensions (11 rows x 15 columns)
-COLUMNS = 15
-ROWS = 11
+from engine import GameState, Inputs, KeyState
+import assets
+from render import DirtyRects, Renderer, SurfaceCache
+from profiler import FrameProfiler, use_profiler, span
+from replay import Recorder, Replay
+import snapshot
+
+# --startup-timing prints how long each stage took to get the title screen up
+STARTUP_TIMING = "--startup-timing" in sys.argv
+startup_marks = [("start", STARTED)]
+title_screen_shown = False
+
+def startup_mark(stage):
+  startup_marks.append((stage, time.perf_counter()))
+
+startup_mark("imports")
+# Only video is needed; fonts start on first use and the game has no sound
+pygame.display.init()
+
+# Tiles on screen at once (11 rows x 15 columns)
+VIEW_COLUMNS = 15
+VIEW_ROWS = 11
+
+# Size of the whole orchard; bigger worlds scroll with the player, e.g. --world=1000x1000
+COLUMNS, ROWS = VIEW_COLUMNS, VIEW_ROWS
+for arg in sys.argv[1:]:
+  if arg.startswith("--world="):
+    COLUMNS, ROWS = (int(n) for n in arg[len("--world="):].split("x"))
+
+# --record=FILE saves every round's seed and input; --replay=FILE plays a recording back
+# (as fast as it can with --fast), in the world it was recorded in
+RECORD_PATH = REPLAY_PATH = None
+for arg in sys.argv[1:]:
+  if arg.startswith("--record="):
+    RECORD_PATH = arg[len("--record="):]
+  if arg.startswith("--replay="):
+    REPLAY_PATH = arg[len("--replay="):]
+REPLAY_FAST = "--fast" in sys.argv
+replay = Replay(REPLAY_PATH) if REPLAY_PATH else None
+if replay:
+  COLUMNS, ROWS = replay.columns, replay.rows
 
 # Define a fixed virtual resolution for design (tiles will be square based on this)
 BASE_WIDTH, BASE_HEIGHT = 960, 704
 # Compute tile size so that they always remain square
-tile_size = min(BASE_WIDTH // COLUMNS, BASE_HEIGHT // ROWS)
-
-# Create a virtual surface to draw the game
-game_surface = pygame.Surface((BASE_WIDTH, BASE_HEIGHT))
+tile_size = min(BASE_WIDTH // VIEW_COLUMNS, BASE_HEIGHT // VIEW_ROWS)
 
 # Open a resizable window
 screen = pygame.display.set_mode((BASE_WIDTH, BASE_HEIGHT), pygame.RESIZABLE)
 pygame.display.set_caption("BIOS 15127")
 
-# Create a simple alternating map array with 9 rows and 11 columns.
-map_array = [
-    [1 if (x + y) % 2 == 0 else 0 for x in range(COLUMNS)]
-    for y in range(ROWS)
-]
+# Draws the game straight onto the window, letterboxed at a scale worked out once per resize
+renderer = Renderer(screen, (BASE_WIDTH, BASE_HEIGHT))
+startup_mark("window")
+
+# Optional render mode for slow machines: only push the regions that changed each frame
+DIRTY_RECT_RENDERING = "--dirty-rects" in sys.argv
+dirty_rects = DirtyRects()
+
+# Frame profiler: F3 shows the overlay, --profile=frames.csv (or .json/.jsonl) streams every frame to disk
+PROFILE_PATH = None
+for arg in sys.argv[1:]:
+  if arg.startswith("--profile="):
+    PROFILE_PATH = arg[len("--profile="):]
+PROFILER_KEY = pygame.K_F3
+frame_profiler = FrameProfiler(record=PROFILE_PATH)
+# atexit so a crash still writes out the frames since the last chunk
+atexit.register(frame_profiler.close)
+use_profiler(frame_profiler)
+show_profiler = False
+profiler_panel = None
+
+# Create a simple alternating map array, ROWS x COLUMNS
+map_array = (np.add.outer(np.arange(ROWS), np.arange(COLUMNS)) % 2 == 0).astype(np.uint8)
 
 # GREEN = (0, 255, 0)
 # BROWN = (139, 69, 19)
@@ -46,125 +99,145 @@ tile_types = [
     TileType("grass", GREEN, False)
 ]
 
-center_tile_x = COLUMNS // 2
-center_tile_y = ROWS // 2
-
-player_x = center_tile_x * tile_size + tile_size // 2 - tile_size // 2
-player_y = center_tile_y * tile_size + tile_size // 2 - tile_size // 2
-
 map_obj = Map(map_array, tile_types, tile_size)
-player = Player(player_x, player_y, tile_size, tile_size, BASE_WIDTH, BASE_HEIGHT, tile_size)
-olives = {}
-pending_olive_removals = []
-
-insect_spawn_timer = pygame.time.get_ticks()
-insect_spawn_delay = 5000  # milliseconds
-insects = []
-mutant_insect_spawn_timer = pygame.time.get_ticks()
-mutant_insect_spawn_delay = 5000
-mutant_insects = []
-
-protections = 1
-
-score = 0
-# Use pygame's consistent built-in font
-font = pygame.font.SysFont("Arial", 22)
-
-start_time = pygame.time.get_ticks()  # Get the time when the game starts
-total_time = 120000 # 120000  # 2 minutes in milliseconds (120 * 1000)
-
-weather_temperature = random.randint(50, 100)
-weather_update_interval = 10000  # 20 seconds in milliseconds
-last_weather_update = pygame.time.get_ticks() 
 
-def generate_weighted_temperature(current_temp):
-  """Generate a new temperature close to the current temperature."""
-  new_temp = round(random.gauss(current_temp, 5))  # Normal distribution centered at current_temp
-  return max(50, min(100, new_temp))  # Keep within range
+# All game state lives in the engine; this file only handles the window, input and drawing.
+# The round is only set up on the first PLAY; its sprites load in the background meanwhile.
+game = None
+recorder = None
+if replay:
+  assets.use_pack(replay.tile_size)
+  game = replay.new_game()
+else:
+  loader = assets.BackgroundLoader(tile_size)
+
+def new_game():
+  global game, recorder
+  # --disease-spread lets sick trees infect their neighbours too
+  game = GameState(COLUMNS, ROWS, tile_size, view_size=(BASE_WIDTH, BASE_HEIGHT),
+                   disease_spread="--disease-spread" in sys.argv)
+  # Interactive play drops time it can't catch up on after a stall
+  game.timestep.max_steps = 15
+  if RECORD_PATH:
+    recorder = Recorder(RECORD_PATH, game)
+  reset_game()
+
+# F5 saves the round to --save=FILE (savegame.oqs by default), F9 loads it back;
+# the round is also autosaved every 30 s of play unless --no-autosave. A loaded round
+# keeps the disease spread setting it was saved with, whatever --disease-spread says
+SAVE_PATH = "savegame.oqs"
+for arg in sys.argv[1:]:
+  if arg.startswith("--save="):
+    SAVE_PATH = arg[len("--save="):]
+SAVE_KEY = pygame.K_F5
+LOAD_KEY = pygame.K_F9
+saver = snapshot.Autosaver(SAVE_PATH, interval=30000 if "--no-autosave" not in sys.argv else float("inf"))
+
+# pygame's bundled font, opened when first drawn with
+font = assets.LazyFont(22)
 
 def reset_game():
-  global player, olives, insects, pending_olive_removals, start_time, game_over
-  global total_time, weather_temperature, last_weather_update, score, mutant_insects 
-
-  player = Player(player_x, player_y, tile_size, tile_size, BASE_WIDTH, BASE_HEIGHT, tile_size)
-  olives = {}
-  insects = []
-  mutant_insects = []
-  pending_olive_removals = []
-  start_time = pygame.time.get_ticks()
-  weather_temperature = random.randint(50, 100)
-  last_weather_update = pygame.time.get_ticks() 
-  score = 0
+  global game_over
   game_over = False
-
-  # Reset timer to full time
-  total_time = 120000 
-
-font_big = pygame.font.SysFont('Arial', 40, bold=True)
-font_small = pygame.font.SysFont('Arial', 30)
-font_smallest = pygame.font.SysFont('Arial', 20)
+  # Every round gets its own seed so a recording can replay it
+  seed = random.getrandbits(32)
+  game.reset(seed=seed)
+  if recorder:
+    recorder.round(seed, game.total_time)
+  # Drop sprite variants left over from the previous round
+  assets.cache.evict_unused()
+
+font_big = assets.LazyFont(40, bold=True)
+font_small = assets.LazyFont(30)
+font_smallest = assets.LazyFont(20)
+
+# Labels are only re-rendered when their text changes (their scaled copies go with them),
+# menu panels are composited once
+text_cache = SurfaceCache(256, on_evict=renderer.release_image)
+panel_cache = SurfaceCache(16)
 
 def draw_button(screen, text, rect, color, text_color):
   pygame.draw.rect(screen, color, rect, border_radius=10)
-  label = font_small.render(text, True, text_color)
+  label = text_cache.render_text(font_small, text, text_color)
   label_rect = label.get_rect(center=rect.center)
   screen.blit(label, label_rect)
 
+def wood_panel(size):
+  """Transparent surface holding the wood-like panel the menus are drawn on."""
+  panel = pygame.Surface(size, pygame.SRCALPHA)
+  panel_rect = panel.get_rect()
+  pygame.draw.rect(panel, BROWN, panel_rect, border_radius=30)
+  pygame.draw.rect(panel, DARK_BROWN, panel_rect, 5, border_radius=30)
+  return panel
+
 def draw_gameover_screen(screen, score):
   screen.fill(GREEN)
 
-  # Draw wood-like panel
   panel_rect = pygame.Rect(100, 100, 400, 500)
-  pygame.draw.rect(screen, BROWN, panel_rect, border_radius=30)
-  pygame.draw.rect(screen, DARK_BROWN, panel_rect, 5, border_radius=30)
 
-  # Draw "Game Over"
-  game_over_text = font_big.render("GAME OVER", True, WHITE)
-  screen.blit(game_over_text, (panel_rect.centerx - game_over_text.get_width() // 2, 140))
+  # Buttons (Restart)
+  restart_button = pygame.Rect(panel_rect.centerx - 100, 350, 200, 50)
+  menu_button = pygame.Rect(panel_rect.centerx - 100, 420, 200, 50)
 
-  # Draw level (static for now, or you could pass level if needed)
-  info_text = font_small.render("Your Profit", True, WHITE)
-  screen.blit(info_text, (panel_rect.centerx - info_text.get_width() // 2, 200))
+  def build():
+    panel = wood_panel(panel_rect.size)
+    # Panel-local coordinates
+    centerx = panel_rect.width // 2
+    top = panel_rect.top
 
-  # Draw score
-  score_text = font_big.render(f"{score:,}", True, YELLOW)
-  screen.blit(score_text, (panel_rect.centerx - score_text.get_width() // 2, 250))
+    # Draw "Game Over"
+    game_over_text = font_big.render("GAME OVER", True, WHITE)
+    panel.blit(game_over_text, (centerx - game_over_text.get_width() // 2, 140 - top))
 
-  # Draw buttons (Restart)
-  restart_button = pygame.Rect(panel_rect.centerx - 100, 350, 200, 50)
-  menu_button = pygame.Rect(panel_rect.centerx - 100, 420, 200, 50)
+    # Draw level (static for now, or you could pass level if needed)
+    info_text = font_small.render("Your Profit", True, WHITE)
+    panel.blit(info_text, (centerx - info_text.get_width() // 2, 200 - top))
+
+    # Draw score
+    score_text = font_big.render(f"{score:,}", True, YELLOW)
+    panel.blit(score_text, (centerx - score_text.get_width() // 2, 250 - top))
+
+    draw_button(panel, "RESTART", restart_button.move(-panel_rect.x, -panel_rect.y), WHITE, BROWN)
+    draw_button(panel, "MAIN MENU", menu_button.move(-panel_rect.x, -panel_rect.y), WHITE, BROWN)
+    return panel
 
-  draw_button(screen, "RESTART", restart_button, WHITE, BROWN)
-  draw_button(screen, "MAIN MENU", menu_button, WHITE, BROWN)
-  
-  pygame.display.flip()
+  screen.blit(panel_cache.get(("gameover", score), build), panel_rect)
   return restart_button, menu_button  # Game should not restart yet
 
-def draw_start_screen(screen):
+def draw_start_screen(screen, progress=1.0):
+  """The title menu; until progress (0..1) reaches 1 the PLAY button is a loading bar."""
   screen.fill(GREEN)
 
   # Wooden panel
   panel_rect = pygame.Rect(100, 100, 400, 500)
-  pygame.draw.rect(screen, BROWN, panel_rect, border_radius=30)
-  pygame.draw.rect(screen, DARK_BROWN, panel_rect, 5, border_radius=30)
 
-  # Title
-  title_text = font_big.render("Got any Olives?!", True, WHITE)
-  screen.blit(title_text, (panel_rect.centerx - title_text.get_width() // 2, 140))
-
-  # Play button
   play_button = pygame.Rect(panel_rect.centerx - 150, 220, 300, 50)
-  draw_button(screen, "PLAY", play_button, WHITE, BROWN)
-
-  # Instructions button
   instructions_button = pygame.Rect(panel_rect.centerx - 150, 290, 300, 50)
-  draw_button(screen, "INSTRUCTIONS", instructions_button, WHITE, BROWN)
-
-  # Exit button
   exit_button = pygame.Rect(panel_rect.centerx - 150, 360, 300, 50)
-  draw_button(screen, "EXIT", exit_button, WHITE, BROWN)
 
-  pygame.display.flip()
+  def build():
+    panel = wood_panel(panel_rect.size)
+
+    # Title
+    title_text = font_big.render("Got any Olives?!", True, WHITE)
+    panel.blit(title_text, (panel_rect.width // 2 - title_text.get_width() // 2, 140 - panel_rect.top))
+
+    # Play, instructions and exit buttons
+    draw_button(panel, "PLAY", play_button.move(-panel_rect.x, -panel_rect.y), WHITE, BROWN)
+    draw_button(panel, "INSTRUCTIONS", instructions_button.move(-panel_rect.x, -panel_rect.y), WHITE, BROWN)
+    draw_button(panel, "EXIT", exit_button.move(-panel_rect.x, -panel_rect.y), WHITE, BROWN)
+    return panel
+
+  screen.blit(panel_cache.get("start", build), panel_rect)
+
+  if progress < 1:
+    pygame.draw.rect(screen, WHITE, play_button, border_radius=10)
+    filled = play_button.inflate(-8, -8)
+    filled.width = int(filled.width * progress)
+    if filled.width > 0:
+      pygame.draw.rect(screen, GREEN, filled, border_radius=8)
+    label = text_cache.render_text(font_small, "LOADING...", BROWN)
+    screen.blit(label, label.get_rect(center=play_button.center))
 
   return play_button, instructions_button, exit_button
 
@@ -182,8 +255,8 @@ def draw_instructions_screen(screen):
 
     panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
 
-    pygame.draw.rect(screen, BROWN, panel_rect, border_radius=30)
-    pygame.draw.rect(screen, DARK_BROWN, panel_rect, 5, border_radius=30)
+    # Position the BACK button within the panel
+    back_button = pygame.Rect(panel_rect.centerx - 100, panel_y + panel_height - 70, 200, 50)
 
     instructions_text = [
         "INSTRUCTIONS",
@@ -200,54 +273,206 @@ def draw_instructions_screen(screen):
         ""
     ]
 
-    # Start Y position based on panel position (more flexible)
-    y = panel_y + 40
-    text_padding_left = 30  # Left margin padding inside the panel
+    def build():
+        panel = wood_panel(panel_rect.size)
 
-    for line in instructions_text:
-        text_surface = font_smallest.render(line, True, WHITE)
-        screen.blit(text_surface, (panel_x + text_padding_left, y))
-        y += 40
+        # Start Y position inside the panel
+        y = 40
+        text_padding_left = 30  # Left margin padding inside the panel
 
-    # Position the BACK button within the panel
-    back_button = pygame.Rect(panel_rect.centerx - 100, panel_y + panel_height - 70, 200, 50)
-    draw_button(screen, "BACK", back_button, WHITE, BROWN)
+        for line in instructions_text:
+            text_surface = font_smallest.render(line, True, WHITE)
+            panel.blit(text_surface, (text_padding_left, y))
+            y += 40
+
+        draw_button(panel, "BACK", back_button.move(-panel_x, -panel_y), WHITE, BROWN)
+        return panel
 
-    pygame.display.flip()
+    screen.blit(panel_cache.get("instructions", build), panel_rect)
 
     return back_button
 
+MOVE_KEYS = (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d)
+
+def draw_game(renderer, game):
+  """Draw one frame of the round straight onto the window."""
+  player = game.player
+  orchard = game.orchard
+
+  remaining_time = game.remaining_time()
+  minutes = remaining_time // 60
+  seconds = remaining_time % 60
+  timer_text = f"{minutes:02}:{seconds:02}"
+
+  renderer.begin_frame()
+  # Draw the world through the camera, visiting only what is on screen
+  view = game.camera.rect
+  if renderer.offset != view.topleft:
+    renderer.set_offset(view.topleft)
+    # Scrolling moves every pixel
+    dirty_rects.invalidate()
+  with span("draw map"):
+    map_obj.draw(renderer, view)
+
+  with span("draw orchard"):
+    orchard.draw_protection(renderer, BROWN, view)
+
+    player.draw_select_tile(renderer)
+
+    # Trees above the player are drawn behind it, the rest in front
+    orchard.draw(renderer, player.rect.bottom, behind=True, view=view)
+    player.draw(renderer)
+    orchard.draw(renderer, player.rect.bottom, behind=False, view=view)
+
+  if DIRTY_RECT_RENDERING:
+    dirty_rects.track("player", player.rect, player.image)
+    dirty_rects.track("select_tile", player.select_tile)
+    slots = orchard.visible_slots(view)
+    for slot, image in zip(slots, orchard.draw_images(slots)):
+      tile_coord = (int(orchard.tile_x[slot]), int(orchard.tile_y[slot]))
+      dirty_rects.track(tile_coord, orchard.rect(slot), (image, orchard.protected[slot]))
+
+  with span("draw insects"):
+    game.swarm.draw(renderer, view)
+    if DIRTY_RECT_RENDERING:
+      for insect_id, rect in game.swarm.rects(view):
+        dirty_rects.track(("insect", insect_id), rect)
+
+  with span("draw hud"):
+    draw_hud(renderer, game, view, timer_text)
+
+def draw_hud(renderer, game, view, timer_text):
+  # The HUD stays put on screen, so it is placed relative to the camera
+  hud_x, hud_y = view.topleft
+  score_text = text_cache.render_text(font, "Profit: " + str(game.score), WHITE)
+  score_rect = score_text.get_rect(topleft=(10, 10)).move(hud_x, hud_y)
+  renderer.blit(score_text, score_rect)
+
+  # **Draw Countdown Timer in the Middle**
+  text_surface = text_cache.render_text(font, timer_text, WHITE)
+  text_rect = text_surface.get_rect(center=(BASE_WIDTH // 2, 10 + font.get_height() // 2))  # Center at top middle
+  text_rect.move_ip(hud_x, hud_y)
+  renderer.blit(text_surface, text_rect)
+
+  weather_text = text_cache.render_text(font, f"Weather: {game.weather_temperature}°F", WHITE)
+  weather_rect = weather_text.get_rect(topright=(BASE_WIDTH - 10, 10))  # Align right
+  weather_rect.move_ip(hud_x, hud_y)
+  renderer.blit(weather_text, weather_rect)
+
+  if DIRTY_RECT_RENDERING:
+    dirty_rects.track("score_text", score_rect, game.score)
+    dirty_rects.track("timer_text", text_rect, timer_text)
+    dirty_rects.track("weather_text", weather_rect, game.weather_temperature)
+
+  if show_profiler:
+    draw_profiler(renderer, (hud_x + 10, hud_y + 40))
+
+def draw_profiler(renderer, pos):
+  """Frame-time overlay, re-rendered a few times a second so it doesn't skew what it measures."""
+  global profiler_panel
+  if profiler_panel is None or frame_profiler.frame_count % 15 == 0:
+    profiler_panel = frame_profiler.render_overlay(font_smallest)
+  renderer.blit(profiler_panel, pos, transient=True)
+  if DIRTY_RECT_RENDERING:
+    dirty_rects.track("profiler", profiler_panel.get_rect(topleft=pos), id(profiler_panel))
+
+def window_event(event):
+  """Handle resizing and the profiler key; True if the event was used up."""
+  global screen, show_profiler
+  # Update display mode if window is resized
+  if event.type == pygame.VIDEORESIZE:
+    screen = pygame.display.set_mode(event.size, pygame.RESIZABLE)
+    renderer.resize(screen)
+    dirty_rects.invalidate()
+    return True
+  if event.type == pygame.KEYDOWN and event.key == PROFILER_KEY:
+    show_profiler = not show_profiler
+    # The overlay leaves a hole when it goes away
+    dirty_rects.invalidate()
+    return True
+  return False
+
+def present_game():
+  with span("present"):
+    if DIRTY_RECT_RENDERING:
+      renderer.present(dirty_rects.collect(game.camera.rect))
+    else:
+      renderer.present()
+
+def play_replay(replay):
+  """Show a recording frame by frame, paced like it was played unless --fast."""
+  clock = pygame.time.Clock()
+  frames = 0
+  for event in replay:
+    if event[0] != "frame":
+      replay.play(game, event)
+      continue
+    frame_profiler.begin_frame()
+    with span("input"):
+      for window in pygame.event.get():
+        if window.type == pygame.QUIT:
+          return
+        window_event(window)
+    with span("simulate"):
+      replay.play(game, event)
+    draw_game(renderer, game)
+    present_game()
+    frame_profiler.end_frame()
+    frames += 1
+    frame_ms = event[2]
+    if not REPLAY_FAST and frame_ms > 0:
+      clock.tick(1000 / frame_ms)
+  print(f"replayed {frames} frames: score {game.score}, game over: {game.game_over}")
+
 #------------------- MAIN GAME LOOP -----------------------------
 
-reset_game()
+if replay:
+  play_replay(replay)
 
-running = True
+running = replay is None
 clock = pygame.time.Clock()
 
 in_start_screen = True
+play_clicked = False
 in_instructions_screen = False
 game_running = False
 game_over = False
 
 while running:
-    screen.fill(GREEN)
-    clock.tick(60)
+    frame_ms = clock.tick(60)
+
+    if not game_running and game:
+      # The simulation is paused outside the game
+      game.timestep.reset()
+      # Menus flip the whole window, so the next game frame must too
+      dirty_rects.invalidate()
+      renderer.invalidate()
+
+    # Turn a few decoded sprites into surfaces each frame, so the menus never stall
+    if not loader.done:
+      loader.update()
 
     if in_start_screen:
+      play_btn, instr_btn, exit_btn = draw_start_screen(screen, loader.progress)
+      pygame.display.flip()
+      if not title_screen_shown:
+        title_screen_shown = True
+        startup_mark("title screen")
+        if STARTUP_TIMING:
+          stages = ", ".join(f"{stage} {(end - start) * 1000:.0f} ms"
+                             for (_, start), (stage, end) in zip(startup_marks, startup_marks[1:]))
+          print(f"Startup: {stages} (total {(startup_marks[-1][1] - STARTED) * 1000:.0f} ms)")
+
       for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
-      
-        play_btn, instr_btn, exit_btn = draw_start_screen(screen)
-        pygame.display.flip()
 
         if event.type == pygame.MOUSEBUTTONDOWN:  # Left click
           mouse_pos = pygame.mouse.get_pos()
 
           if play_btn.collidepoint(mouse_pos):
-            in_start_screen = False
-            game_running = True  # Start the game
-            start_time = pygame.time.get_ticks()
+            # Starts as soon as the sprites are in
+            play_clicked = True
             break
           elif instr_btn.collidepoint(mouse_pos):
             in_start_screen = False
@@ -258,14 +483,24 @@ while running:
             sys.exit()
             break
 
+      if play_clicked and loader.done:
+        play_clicked = False
+        in_start_screen = False
+        game_running = True  # Start the game
+        if game is None:
+          new_game()
+        game.start()
+        if recorder:
+          recorder.start()
+
     elif in_instructions_screen:
+      back_btn = draw_instructions_screen(screen)
+      pygame.display.flip()
+
       for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
 
-        back_btn = draw_instructions_screen(screen)
-        pygame.display.flip()
-
         if event.type == pygame.MOUSEBUTTONDOWN:
             mouse_pos = pygame.mouse.get_pos()
             if back_btn.collidepoint(mouse_pos):
@@ -273,12 +508,13 @@ while running:
                 in_start_screen = True  # Back to start screen
 
     elif game_over:
+       restart_button, menu_button = draw_gameover_screen(screen, game.score)
+       pygame.display.flip()
+
        for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
 
-        restart_button, menu_button = draw_gameover_screen(screen, score)
-
         if event.type == pygame.MOUSEBUTTONDOWN:
           mouse_pos = pygame.mouse.get_pos()
           if restart_button.collidepoint(mouse_pos):
@@ -291,172 +527,59 @@ while running:
             break
 
     elif game_running:
-        elapsed_time = pygame.time.get_ticks() - start_time
-        remaining_time = max(0, (total_time - elapsed_time) // 1000)
-        minutes = remaining_time // 60
-        seconds = remaining_time % 60
-        timer_text = f"{minutes:02}:{seconds:02}"
-
-        current_time = pygame.time.get_ticks()
-        if current_time - last_weather_update >= weather_update_interval:
-          weather_temperature = generate_weighted_temperature(weather_temperature)  # Pick a new temperature
-          last_weather_update = current_time  # Reset the timer
-
-        for olive in olives.values():
-          olive.update_weather(weather_temperature)
-
-        if remaining_time <= 0:
+        if game.game_over:
           game_over = True
           game_running = False
-          draw_gameover_screen(screen, score)
           continue
 
-        if not game_over:
+        frame_profiler.begin_frame()
+
+        # Collect this frame's input and hand it to the engine
+        pressed = []
+        clicks = []
+        with span("input"):
           for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
 
-            if not game_over:   
-              # Update display mode if window is resized
-              if event.type == pygame.VIDEORESIZE:
-                  screen = pygame.display.set_mode(event.size, pygame.RESIZABLE)
-              if (event.type == pygame.KEYDOWN and player.water_mode_start is None and 
-                  player.remove_mode_start is None):
-                if event.key == pygame.K_p:
-                    olive = player.plant_olive(map_obj.tile_size, weather_temperature)
-                    tile_coord = (olive.rect.x // map_obj.tile_size, olive.rect.y // map_obj.tile_size)
-                    if tile_coord not in olives:
-                        olives[tile_coord] = olive
-                if event.key == pygame.K_o:
-                    for olive in olives.values():
-                        if player.select_tile.colliderect(olive.rect):
-                            olive.start_growth()
-                    player.activate_water_mode()
-                if event.key == pygame.K_SPACE:
-                  for olive in olives.values():
-                    if olive.fruit_ready and player.select_tile.colliderect(olive.rect):
-                      if olive.harvest(): 
-                        score += 100
-                if event.key == pygame.K_l:
-                    for olive in olives.values():
-                      if player.select_tile.colliderect(olive.rect):
-                          if protections > 0:
-                            olive.protect()
-                            protections = protections - 1
-
-                if event.key == pygame.K_r: 
-                  for tile_coord, olive in olives.items():
-                    if player.select_tile.colliderect(olive.rect):
-                        removal_time = pygame.time.get_ticks() + 4000  # 4 seconds later
-                        pending_olive_removals.append((tile_coord, removal_time))
-                        break
-                    
-                  player.activate_remove_mode()
-
-              if event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
-                for insect in insects[:]:  
-                  if insect.rect.collidepoint(mouse_pos):
-                      insects.remove(insect)
-                for mutant_insect in mutant_insects[:]:
-                  if mutant_insect.rect.collidepoint(mouse_pos):
-                      mutant_insects.remove(mutant_insect)
-
-              if remaining_time <= 0:
-                game_over = True
-                game_running = False
-                break
-
-                          
-        # Spawn insects periodically if there are olives
-        if olives and remaining_time > total_time // (1000 * 2):
-            current_time = pygame.time.get_ticks()
-            if (current_time - insect_spawn_timer >= insect_spawn_delay):
-                new_insect = Insect(BASE_WIDTH, BASE_HEIGHT, olives)
-                insects.append(new_insect)
-                insect_spawn_timer = current_time
-
-        if olives and remaining_time < total_time // (1000 * 2):
-            current_time = pygame.time.get_ticks()
-            if (current_time - mutant_insect_spawn_timer >= mutant_insect_spawn_delay):
-                new_mutant_insect = MutantInsect(BASE_WIDTH, BASE_HEIGHT, olives)
-                mutant_insects.append(new_mutant_insect)
-                mutant_insect_spawn_timer = current_time
-
-        current_time = pygame.time.get_ticks()
-        for tile_coord, removal_time in pending_olive_removals[:]:
-            if current_time >= removal_time:
-                if tile_coord in olives:
-                    del olives[tile_coord]
-                pending_olive_removals.remove((tile_coord, removal_time))
-
-        keys = pygame.key.get_pressed()
-        obstacles = [olive for olive in olives.values() if olive.is_obstacle()]
-        player.move(keys, obstacles)
-
-        # Draw all game elements on the virtual game_surface
-        game_surface.fill(GREEN)
-        map_obj.draw(game_surface)
-
-        for olive in olives.values():
-          if olive.protected == True: 
-            BROWN = (139, 69, 19)
-            pygame.draw.rect(game_surface, BROWN, olive.rect)
-
-        player.draw_select_tile(game_surface)
-
-        for olive in olives.values():
-          if olive.rect.bottom < player.rect.bottom:
-            olive.draw(game_surface)
-        player.draw(game_surface)
-        for olive in olives.values():
-          if olive.rect.bottom >= player.rect.bottom:
-            olive.draw(game_surface)
-        
-        insects_to_remove = []
-        mutant_insects_to_remove = []
-        for insect in insects:
-          if insect.update():  # If update() returns True, the insect has flown away
-              insects_to_remove.append(insect)
-          else:
-              insect.draw(game_surface)
-
-        for mutant_insect in mutant_insects:
-          if mutant_insect.update():  # If update() returns True, the insect has flown away
-              mutant_insects_to_remove.append(mutant_insect)
-          else:
-              mutant_insect.draw(game_surface)
-
-        for insect in insects_to_remove:
-          insects.remove(insect)
-
-        for mutant_insect in mutant_insects_to_remove:
-          mutant_insects.remove(mutant_insect)
-          
-        score_text = font.render("Profit: " + str(score), True, (255, 255, 255))
-        game_surface.blit(score_text, (10, 10))
-
-        # **Draw Countdown Timer in the Middle**
-        text_surface = font.render(timer_text, True, (255, 255, 255))
-        text_rect = text_surface.get_rect(center=(BASE_WIDTH // 2, 10 + font.get_height() // 2))  # Center at top middle
-        game_surface.blit(text_surface, text_rect)
-
-        weather_text = font.render(f"Weather: {weather_temperature}°F", True, (255, 255, 255))
-        weather_rect = weather_text.get_rect(topright=(BASE_WIDTH - 10, 10))  # Align right
-        game_surface.blit(weather_text, weather_rect)
-
-        # When drawing to the actual screen, compute a uniform scale factor so tiles remain square.
-        window_width, window_height = screen.get_size()
-        scale_factor = min(window_width / BASE_WIDTH, window_height / BASE_HEIGHT)
-        scaled_width = int(BASE_WIDTH * scale_factor)
-        scaled_height = int(BASE_HEIGHT * scale_factor)
-        scaled_surface = pygame.transform.scale(game_surface, (scaled_width, scaled_height))
-
-        # Center the scaled surface on the window (adding letterboxing if necessary)
-        x = (window_width - scaled_width) // 2
-        y = (window_height - scaled_height) // 2
-        screen.fill(BLACK)
-        screen.blit(scaled_surface, (x, y))
-        pygame.display.flip()
+            if window_event(event):
+                continue
+            if event.type == pygame.KEYDOWN:
+                if event.key == SAVE_KEY:
+                  saver.save(game)
+                # A loaded round can't be replayed from the recording, so loading is off while recording
+                elif event.key == LOAD_KEY and not recorder:
+                  spread = game.disease_spread
+                  try:
+                    snapshot.load(game, SAVE_PATH)
+                  except (OSError, ValueError) as error:
+                    print(f"Couldn't load {SAVE_PATH}: {error}")
+                  if game.disease_spread != spread:
+                    print(f"{SAVE_PATH} was saved with disease spread {'on' if game.disease_spread else 'off'}")
+                  dirty_rects.invalidate()
+                else:
+                  pressed.append(event.key)
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                clicks.append(renderer.to_game(pygame.mouse.get_pos()))
+
+          keys = pygame.key.get_pressed()
+          held = KeyState(key for key in MOVE_KEYS if keys[key])
+
+        with span("simulate"):
+          inputs = Inputs(held, pressed, clicks)
+          if recorder:
+            recorder.frame(inputs, frame_ms)
+          game.step(inputs, frame_ms)
+        saver.update(game)
+
+        draw_game(renderer, game)
+        present_game()
+
+        frame_profiler.end_frame()
+
+saver.close()
+if recorder:
+  recorder.close()
+frame_profiler.close()
 
 pygame.quit()
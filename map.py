@@ -1,28 +1,105 @@
+import numpy as np
 import pygame
+from render import SurfaceCache
 
 class TileType():
   def __init__(self, type, color, is_solid):
     self.type = type
     # self.image = image
-    self.color = pygame.Surface((100, 100))
-    self.color.fill(color)
+    self.rgb = color
     self.is_solid = is_solid
 
 class Map():
-  def __init__(self, map_array, tile_type, tile_size):
+  """Tile map stored and drawn in square chunks, so only the chunks on screen cost anything.
+
+  Each chunk keeps its tile codes in a small array; its picture is composited
+  the first time it is seen and kept in an LRU, repainting only tiles marked dirty.
+  """
+
+  def __init__(self, map_array, tile_type, tile_size, chunk_size=8, max_chunks=48):
     self.tile_type = tile_type
     self.tile_size = tile_size
-    
-    self.tiles = []
-    for row in map_array:
-      self.tiles_row = []
-      for col in row: 
-        self.tiles_row.append(col)
-      self.tiles.append(self.tiles_row)
-
-  def draw(self, screen):
-    for y, row in enumerate(self.tiles): 
-      for x, tile in enumerate(row): 
-        location = (x * self.tile_size, y * self.tile_size)
-        image = self.tile_type[tile].color
-        screen.blit(image, location)
+    self.chunk_size = chunk_size
+
+    tiles = np.asarray(map_array, np.uint8)
+    self.rows, self.columns = tiles.shape if tiles.size else (0, 0)
+
+    self.chunks = {}  # (chunk_x, chunk_y) -> tile codes of that chunk
+    for top in range(0, self.rows, chunk_size):
+      for left in range(0, self.columns, chunk_size):
+        self.chunks[(left // chunk_size, top // chunk_size)] = tiles[top:top + chunk_size, left:left + chunk_size].copy()
+
+    # Composited chunks, only repainted where a tile is marked dirty
+    self.evicted = []  # surfaces dropped from the cache, for the renderer to forget
+    self.surfaces = SurfaceCache(max_chunks, on_evict=self.evicted.append)
+    self.dirty_tiles = {}  # chunk -> set of dirty tiles in it
+
+  def get_tile(self, x, y):
+    chunk = self.chunks[(x // self.chunk_size, y // self.chunk_size)]
+    return int(chunk[y % self.chunk_size, x % self.chunk_size])
+
+  def set_tile(self, x, y, tile):
+    key = (x // self.chunk_size, y // self.chunk_size)
+    chunk = self.chunks[key]
+    if chunk[y % self.chunk_size, x % self.chunk_size] != tile:
+      chunk[y % self.chunk_size, x % self.chunk_size] = tile
+      self.dirty_tiles.setdefault(key, set()).add((x, y))
+
+  def mark_dirty(self, x=None, y=None):
+    """Invalidate one tile, or every chunk when called without coordinates."""
+    if x is None:
+      self.surfaces.clear()
+      self.dirty_tiles.clear()
+    else:
+      self.dirty_tiles.setdefault((x // self.chunk_size, y // self.chunk_size), set()).add((x, y))
+
+  def draw_tile(self, surface, x, y, origin=(0, 0)):
+    rect = (x * self.tile_size - origin[0], y * self.tile_size - origin[1], self.tile_size, self.tile_size)
+    surface.fill(self.tile_type[self.get_tile(x, y)].rgb, rect)
+
+  def chunk_origin(self, key):
+    span = self.chunk_size * self.tile_size
+    return key[0] * span, key[1] * span
+
+  def build_chunk(self, key):
+    tiles = self.chunks[key]
+    rows, columns = tiles.shape
+    surface = pygame.Surface((columns * self.tile_size, rows * self.tile_size))
+    if pygame.display.get_surface() is not None:
+      surface = surface.convert()
+    left, top = key[0] * self.chunk_size, key[1] * self.chunk_size
+    for y in range(rows):
+      for x in range(columns):
+        self.draw_tile(surface, left + x, top + y, self.chunk_origin(key))
+    self.dirty_tiles.pop(key, None)
+    return surface
+
+  def visible_chunks(self, view=None):
+    """Chunk keys overlapping view (a rect in world pixels), or every chunk."""
+    if view is None:
+      return list(self.chunks)
+    span = self.chunk_size * self.tile_size
+    view = pygame.Rect(view)
+    return [(x, y)
+            for y in range(max(0, view.top // span), (view.bottom - 1) // span + 1)
+            for x in range(max(0, view.left // span), (view.right - 1) // span + 1)
+            if (x, y) in self.chunks]
+
+  def draw(self, screen, view=None):
+    """Blit the chunks inside view (world pixels); without a view the whole map is drawn."""
+    for key in self.visible_chunks(view):
+      surface = self.surfaces.peek(key)
+      dirty = self.dirty_tiles.pop(key, None)
+      if surface is not None and dirty:
+        for x, y in dirty:
+          self.draw_tile(surface, x, y, self.chunk_origin(key))
+        # A renderer keeps a pre-scaled copy of the chunk that is now stale
+        if hasattr(screen, "invalidate_image"):
+          screen.invalidate_image(surface)
+      surface = self.surfaces.get(key, lambda: self.build_chunk(key))
+      screen.blit(surface, self.chunk_origin(key))
+
+    if self.evicted and hasattr(screen, "release_image"):
+      for surface in self.evicted:
+        screen.release_image(surface)
+    del self.evicted[:]
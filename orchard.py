@@ -0,0 +1,369 @@
+import numpy as np
+import pygame
+from assets import load_image
+from weather import lookup_infection_rate
+from render import draw_rect
+import gameclock
+import scheduler
+
+# Status codes; STATUSES maps them back to their names
+HEALTHY, UNHEALTHY, SICK, DEAD = range(4)
+STATUSES = ("healthy", "unhealthy", "sick", "dead")
+
+# Image codes, in the order of IMAGE_PATHS
+SEED, TEEN, ADULT, HARVEST, SICK_IMAGE, DEAD_IMAGE = range(6)
+IMAGE_PATHS = (
+  "images/olive_seed.png",
+  "images/olive_teen.png",
+  "images/olive_adult.png",
+  "images/olive_adult_fruit.png",
+  "images/olive_sick.png",
+  "images/olive_dead.png",
+)
+
+SOLID_DELAY = 2000  # ms after watering before a tree blocks the player
+
+_FIELDS = (
+  ("tile_x", np.int32), ("tile_y", np.int32),
+  ("serial", np.int64),               # tells a replanted tile apart from the tree it replaced
+  ("status", np.int8), ("image", np.int8),
+  ("growth_started", np.bool_), ("fruit_ready", np.bool_), ("protected", np.bool_),
+  ("start_time", np.int64), ("last_production_time", np.int64),
+  ("unhealthy_start_time", np.int64), ("protected_time", np.int64),
+  ("infection_rate", np.float64),
+)
+
+
+class OliveView:
+  """Handle on one tree in an Orchard, for code that wants an object (insect targets)."""
+
+  def __init__(self, orchard, tile, serial):
+    self.orchard = orchard
+    self.tile = tile
+    self.serial = serial
+    size = orchard.tile_size
+    self.rect = pygame.Rect(tile[0] * size, tile[1] * size, size, size)
+
+  def slot(self):
+    """Slot of the tree, or None once it has been removed."""
+    slot = self.orchard.index.get(self.tile)
+    if slot is None or self.orchard.serial[slot] != self.serial:
+      return None
+    return slot
+
+  def __getattr__(self, name):
+    # Read-through to the arrays (growth_started, fruit_ready, protected...)
+    if name in self.orchard.field_names:
+      slot = self.slot()
+      return False if slot is None else getattr(self.orchard, name)[slot].item()
+    raise AttributeError(name)
+
+  @property
+  def status(self):
+    slot = self.slot()
+    return "dead" if slot is None else STATUSES[self.orchard.status[slot]]
+
+  def infect(self):
+    slot = self.slot()
+    if slot is not None:
+      self.orchard.infect(slot)
+
+  def mutant_infect(self):
+    slot = self.slot()
+    if slot is not None:
+      self.orchard.infect(slot, mutant=True)
+
+  def is_obstacle(self):
+    slot = self.slot()
+    if slot is None or not self.orchard.growth_started[slot]:
+      return False
+    return gameclock.get_ticks() - self.orchard.start_time[slot] >= SOLID_DELAY
+
+
+class Orchard:
+  """Lifecycle state of every olive tree, stored as compact parallel arrays.
+
+  Trees are addressed by tile coordinate through index; removing a tree moves
+  the last slot into the hole so the arrays stay dense.
+  """
+
+  field_names = frozenset(name for name, dtype in _FIELDS)
+
+  def __init__(self, tile_size, capacity=64, grid=None, targets=None):
+    self.tile_size = tile_size
+    self.grid = grid  # CollisionGrid told when trees become solid or go away
+    self.targets = targets  # TargetIndex told when trees start or stop being insect targets
+    self.count = 0
+    self.next_serial = 0
+    self.index = {}  # (tile_x, tile_y) -> slot, in planting order
+    self.slot_grid = None  # optional rows x columns raster of index (-1 = empty), see track_slots()
+    # Pending make_solid and remove timers by tile, cancelled when the tree goes
+    self.solid_timers = {}
+    self.removal_timers = {}
+    for name, dtype in _FIELDS:
+      setattr(self, name, np.zeros(capacity, dtype))
+    self.images = [load_image(path, (tile_size, tile_size)) for path in IMAGE_PATHS]
+
+  def __len__(self):
+    return self.count
+
+  def __contains__(self, tile):
+    return tile in self.index
+
+  def __bool__(self):
+    return self.count > 0
+
+  def _grow(self):
+    capacity = max(64, len(self.status) * 2)
+    for name, dtype in _FIELDS:
+      array = np.zeros(capacity, dtype)
+      array[:self.count] = getattr(self, name)[:self.count]
+      setattr(self, name, array)
+
+  def plant(self, tile, weather, now=None):
+    """Plant a seed on an empty tile; returns False if the tile is taken."""
+    if tile in self.index:
+      return False
+    if self.count == len(self.status):
+      self._grow()
+    slot = self.count
+    for name, dtype in _FIELDS:
+      getattr(self, name)[slot] = 0
+    self.tile_x[slot], self.tile_y[slot] = tile
+    self.serial[slot] = self.next_serial
+    self.next_serial += 1
+    self.status[slot] = HEALTHY
+    self.image[slot] = SEED
+    self.last_production_time[slot] = gameclock.get_ticks() if now is None else now
+    self.infection_rate[slot] = lookup_infection_rate(weather)
+    self.index[tile] = slot
+    if self.slot_grid is not None:
+      self.slot_grid[tile[1], tile[0]] = slot
+    self.count += 1
+    return True
+
+  def schedule_removal(self, when, tile):
+    """Remove the tree on tile at when; a removal already pending for it stands."""
+    if tile not in self.removal_timers:
+      self.removal_timers[tile] = scheduler.schedule(when, self.remove, tile)
+
+  def remove(self, tile):
+    slot = self.index.pop(tile, None)
+    if slot is None:
+      return False
+    for timers in (self.solid_timers, self.removal_timers):
+      timer = timers.pop(tile, None)
+      if timer is not None:
+        timer.cancel()
+    if self.grid is not None:
+      self.grid.clear(tile)
+    if self.targets is not None:
+      self.targets.discard(tile)
+    last = self.count - 1
+    if self.slot_grid is not None:
+      self.slot_grid[tile[1], tile[0]] = -1
+    if slot != last:
+      for name, dtype in _FIELDS:
+        array = getattr(self, name)
+        array[slot] = array[last]
+      self.index[(int(self.tile_x[slot]), int(self.tile_y[slot]))] = slot
+      if self.slot_grid is not None:
+        self.slot_grid[self.tile_y[slot], self.tile_x[slot]] = slot
+    self.count -= 1
+    return True
+
+  def track_slots(self, columns, rows):
+    """Keep slot_grid, a per-tile array of slots, so whole neighbourhoods can be looked up at once."""
+    if self.slot_grid is None or self.slot_grid.shape != (rows, columns):
+      self.slot_grid = np.full((rows, columns), -1, np.int32)
+      n = self.count
+      self.slot_grid[self.tile_y[:n], self.tile_x[:n]] = np.arange(n)
+    return self.slot_grid
+
+  def view(self, tile):
+    slot = self.index.get(tile)
+    return None if slot is None else OliveView(self, tile, int(self.serial[slot]))
+
+  def views(self, slots=None):
+    """OliveViews in planting order, optionally limited to a boolean slot mask."""
+    return {tile: OliveView(self, tile, int(self.serial[slot]))
+            for tile, slot in self.index.items() if slots is None or slots[slot]}
+
+  def rect(self, slot):
+    size = self.tile_size
+    return pygame.Rect(int(self.tile_x[slot]) * size, int(self.tile_y[slot]) * size, size, size)
+
+  def slot_at(self, tile):
+    """Slot of the tree on tile, or None if the tile is empty."""
+    return self.index.get(tile)
+
+  def slots_in(self, tiles):
+    """Sorted slots of the trees inside the tile range (left, top, right, bottom), right/bottom exclusive.
+
+    Looks up each tile in the range when that is cheaper than testing every tree.
+    """
+    left, top, right, bottom = tiles
+    n = self.count
+    if (right - left) * (bottom - top) >= n:
+      x = self.tile_x[:n]
+      y = self.tile_y[:n]
+      return np.flatnonzero((x >= left) & (x < right) & (y >= top) & (y < bottom))
+    index = self.index
+    slots = [index[(x, y)] for y in range(top, bottom) for x in range(left, right) if (x, y) in index]
+    return np.array(sorted(slots), np.int64)
+
+  # Per-tree actions
+
+  def start_growth(self, slot, now=None):
+    if not self.growth_started[slot] and self.status[slot] == HEALTHY:
+      now = gameclock.get_ticks() if now is None else now
+      self.growth_started[slot] = True
+      self.start_time[slot] = now
+      self.last_production_time[slot] = now
+      tile = (int(self.tile_x[slot]), int(self.tile_y[slot]))
+      self.solid_timers[tile] = scheduler.schedule(now + SOLID_DELAY, self.make_solid, tile)
+      if self.targets is not None:
+        self.targets.add(tile, int(self.serial[slot]))
+
+  def infect(self, slot, mutant=False, now=None):
+    """Called when an insect reaches this tree; mutants ignore protection."""
+    if self.status[slot] == HEALTHY and (mutant or not self.protected[slot]):
+      self.unhealthy_start_time[slot] = gameclock.get_ticks() if now is None else now
+      self.status[slot] = UNHEALTHY
+      # Stop any further fruit production.
+      self.fruit_ready[slot] = True
+
+  def infect_many(self, slots, now=None):
+    """Infect the healthy trees among slots in one go (spread between trees, which has already weighed protection)."""
+    slots = slots[self.status[slots] == HEALTHY]
+    self.unhealthy_start_time[slots] = gameclock.get_ticks() if now is None else now
+    self.status[slots] = UNHEALTHY
+    self.fruit_ready[slots] = True
+    return slots
+
+  def protect(self, slot, now=None):
+    self.protected[slot] = True
+    self.protected_time[slot] = gameclock.get_ticks() if now is None else now
+
+  def harvest(self, slot, now=None):
+    """If fruit is available, harvest it and reset the production timer."""
+    if self.fruit_ready[slot] and self.status[slot] != DEAD:
+      self.fruit_ready[slot] = False
+      self.last_production_time[slot] = gameclock.get_ticks() if now is None else now
+      self.image[slot] = ADULT
+      return True
+    return False
+
+  # Whole-orchard updates
+
+  def set_weather(self, weather):
+    self.set_infection_rate(lookup_infection_rate(weather))
+
+  def set_infection_rate(self, rate):
+    self.infection_rate[:self.count] = rate
+
+  def make_solid(self, tile):
+    """Scheduled SOLID_DELAY after watering: the tree now blocks the player."""
+    del self.solid_timers[tile]
+    if self.grid is not None:
+      self.grid.set_solid(tile)
+
+  def update(self, now=None, slots=None):
+    """Advance growth, fruiting, sickness, death and recovery for every tree at once.
+
+    slots limits the pass to some trees (the ones on screen, a batch of the rest).
+    """
+    n = self.count
+    if n == 0:
+      return
+    now = gameclock.get_ticks() if now is None else now
+    # Slicing works on the arrays in place; a slot list works on copies written back below
+    sel = slice(0, n) if slots is None else slots
+
+    growing = self.growth_started[sel]
+    status = self.status[sel]
+    image = self.image[sel]
+    fruit_ready = self.fruit_ready[sel]
+    protected = self.protected[sel]
+    rate = self.infection_rate[sel]
+
+    elapsed = (now - self.start_time[sel]) / 1000.0
+    since_infection = (now - self.unhealthy_start_time[sel]) / 1000.0
+    since_protection = (now - self.protected_time[sel]) / 1000.0
+
+    healthy = growing & (status == HEALTHY)
+    unhealthy = growing & (status == UNHEALTHY)
+    sick = growing & (status == SICK)
+    dead = growing & (status == DEAD)
+
+    # Healthy trees grow from seed to teen (4 s) to adult (10 s), then fruit every 3 s
+    adult = healthy & (elapsed >= 10)
+    image[healthy & (elapsed < 4)] = SEED
+    image[healthy & (elapsed >= 4) & (elapsed < 10)] = TEEN
+    image[adult] = ADULT
+    fruit_ready[adult & ~fruit_ready & (now - self.last_production_time[sel] >= 3000)] = True
+
+    # Unprotected infections turn sick halfway and kill the tree at the infection rate
+    dies = (unhealthy | sick) & ~protected & (since_infection >= rate)
+    turns_sick = unhealthy & ~protected & ~dies & (since_infection >= rate // 2)
+
+    # Protection nurses a tree back one stage at a time
+    revived = dead & protected & (since_protection >= 2)
+    sick_recovers = sick & protected & (since_protection >= 4)
+    recovers = unhealthy & protected & (since_protection >= 6)
+
+    status[dies] = DEAD
+    image[dies] = DEAD_IMAGE
+    fruit_ready[dies] = False
+
+    status[turns_sick | revived] = SICK
+    image[turns_sick | revived] = SICK_IMAGE
+    fruit_ready[revived] = True
+
+    status[sick_recovers] = UNHEALTHY
+    status[recovers] = HEALTHY
+    image[sick_recovers | recovers] = ADULT
+    fruit_ready[sick_recovers | recovers] = True
+
+    if slots is not None:
+      self.status[slots] = status
+      self.image[slots] = image
+      self.fruit_ready[slots] = fruit_ready
+
+    # Dead trees stop drawing insects until protection brings them back
+    if self.targets is not None and (dies.any() or revived.any()):
+      chosen = np.arange(n) if slots is None else slots
+      for slot in chosen[dies]:
+        self.targets.discard((int(self.tile_x[slot]), int(self.tile_y[slot])))
+      for slot in chosen[revived]:
+        self.targets.add((int(self.tile_x[slot]), int(self.tile_y[slot])), int(self.serial[slot]))
+
+  def draw_images(self, slots=None):
+    """Image code each tree (or each of slots) is drawn with (ripe trees show their fruit)."""
+    sel = slice(0, self.count) if slots is None else slots
+    ripe = self.fruit_ready[sel] & (self.status[sel] != DEAD)
+    return np.where(ripe, HARVEST, self.image[sel])
+
+  def draw_protection(self, screen, color, view=None):
+    """Mark protected trees with a filled tile underneath them."""
+    slots = self.visible_slots(view)
+    for slot in slots[self.protected[slots]]:
+      draw_rect(screen, color, self.rect(slot))
+
+  def visible_slots(self, view=None):
+    """Slots of the trees overlapping view (a rect in world pixels), or all of them."""
+    if view is None:
+      return np.arange(self.count)
+    size = self.tile_size
+    return self.slots_in((view.left // size, view.top // size,
+                          (view.right - 1) // size + 1, (view.bottom - 1) // size + 1))
+
+  def draw(self, screen, player_bottom=None, behind=True, view=None):
+    """Draw the trees; with player_bottom, only those behind (or in front of) the player."""
+    slots = self.visible_slots(view)
+    if player_bottom is not None:
+      bottoms = (self.tile_y[slots] + 1) * self.tile_size
+      slots = slots[bottoms < player_bottom] if behind else slots[bottoms >= player_bottom]
+    size = self.tile_size
+    for slot, image in zip(slots, self.draw_images(slots)):
+      screen.blit(self.images[image], (int(self.tile_x[slot]) * size, int(self.tile_y[slot]) * size))
@@ -1,13 +1,16 @@
 import pygame
-from olive import Olive
+from assets import load_image
+from render import draw_rect
+import gameclock
+import scheduler
 
 class Player:
   
   def __init__(self, x, y, width, height, screen_width, screen_height, tile_size):
     RED = (255, 0, 0)
-    self.normal_image = pygame.transform.scale(pygame.image.load("images/duck.png").convert_alpha(), (width, height))
-    self.water_image = pygame.transform.scale(pygame.image.load("images/duck_water.png"), (width, height))
-    self.remove_image = pygame.transform.scale(pygame.image.load("images/duck_remove.png"), (width, height))
+    self.normal_image = load_image("images/duck.png", (width, height))
+    self.water_image = load_image("images/duck_water.png", (width, height))
+    self.remove_image = load_image("images/duck_remove.png", (width, height))
     self.image = self.normal_image
 
     self.rect = self.image.get_rect(topleft=(x, y))
@@ -29,18 +32,17 @@ class Player:
     self.water_mode_duration = 2000
     self.remove_mode_start = None
     self.remove_mode_duration = 4000
+    self.mode_timer = None  # pending end of the current mode
 
     self.px = self.rect.x // self.tile_size
     self.py = self.rect.y // self.tile_size
 
-  def unstuck(self, obstacles):
-    for olive in obstacles:
-      if not olive.is_obstacle():
-        continue
-      
-      if self.rect.colliderect(olive.rect):
-        overlap_x = min(self.rect.right, olive.rect.right) - max(self.rect.left, olive.rect.left)
-        overlap_y = min(self.rect.bottom, olive.rect.bottom) - max(self.rect.top, olive.rect.top)
+  def unstuck(self, grid):
+    # Only the solid tiles the player overlaps can hold it
+    for tile_rect in grid.solid_rects(self.rect):
+      if self.rect.colliderect(tile_rect):
+        overlap_x = min(self.rect.right, tile_rect.right) - max(self.rect.left, tile_rect.left)
+        overlap_y = min(self.rect.bottom, tile_rect.bottom) - max(self.rect.top, tile_rect.top)
         overlap_area = overlap_x * overlap_y
 
         player_area = self.rect.width * self.rect.height
@@ -51,16 +53,17 @@ class Player:
             continue
 
         # Now resolve by pushing player out (same logic as before)
-        if self.rect.bottom > olive.rect.top and self.rect.top < olive.rect.top:
-          self.rect.bottom = olive.rect.top  # Push up
-        elif self.rect.top < olive.rect.bottom and self.rect.bottom > olive.rect.bottom:
-          self.rect.top = olive.rect.bottom  # Push down
-        elif self.rect.right > olive.rect.left and self.rect.left < olive.rect.left:
-          self.rect.right = olive.rect.left  # Push left
-        elif self.rect.left < olive.rect.right and self.rect.right > olive.rect.right:
-          self.rect.left = olive.rect.right  # Push right
-
-  def move(self, keys, obstacles):
+        if self.rect.bottom > tile_rect.top and self.rect.top < tile_rect.top:
+          self.rect.bottom = tile_rect.top  # Push up
+        elif self.rect.top < tile_rect.bottom and self.rect.bottom > tile_rect.bottom:
+          self.rect.top = tile_rect.bottom  # Push down
+        elif self.rect.right > tile_rect.left and self.rect.left < tile_rect.left:
+          self.rect.right = tile_rect.left  # Push left
+        elif self.rect.left < tile_rect.right and self.rect.right > tile_rect.right:
+          self.rect.left = tile_rect.right  # Push right
+
+  def move(self, keys, grid):
+    """Walk with WASD; grid is the CollisionGrid of solid tiles."""
     if self.water_mode_start is not None or self.remove_mode_start is not None:
       return
     
@@ -79,13 +82,13 @@ class Player:
     if keys[pygame.K_a] and self.rect.x > 0:
         new_rect.x -= self.speed
         self.select_tile.x, self.select_tile.y = get_adjacent_tile_offset(-1, 0)
-        if not any(olive.rect.collidepoint(new_rect.center) for olive in obstacles):
+        if not grid.blocked(new_rect.center):
             self.rect.x -= self.speed
 
     if keys[pygame.K_d] and self.rect.x < self.screen_width - self.rect.width:
         new_rect.x += self.speed
         self.select_tile.x, self.select_tile.y = get_adjacent_tile_offset(1, 0)
-        if not any(olive.rect.collidepoint(new_rect.center) for olive in obstacles):
+        if not grid.blocked(new_rect.center):
             self.rect.x += self.speed
 
     new_rect = self.rect.copy() 
@@ -93,52 +96,59 @@ class Player:
     if keys[pygame.K_w] and self.rect.y > 0:
         new_rect.y -= self.speed
         self.select_tile.x, self.select_tile.y = get_adjacent_tile_offset(0, -1)
-        if not any(olive.rect.collidepoint(new_rect.center) for olive in obstacles):
+        if not grid.blocked(new_rect.center):
             self.rect.y -= self.speed
 
     if keys[pygame.K_s] and self.rect.y < self.screen_height - self.rect.height:
         new_rect.y += self.speed
         self.select_tile.x, self.select_tile.y = get_adjacent_tile_offset(0, 1)
-        if not any(olive.rect.collidepoint(new_rect.center) for olive in obstacles):
+        if not grid.blocked(new_rect.center):
             self.rect.y += self.speed
 
 
 
-    self.unstuck(obstacles)
+    self.unstuck(grid)
 
   def get_pos(self):
     return (self.rect.x, self.rect.y)
 
-  def plant_olive(self, tile_size, weather):
-    # Compute the grid-aligned position using the select_tile's coordinates.
-    tile_x = ((self.select_tile.x + tile_size // 2)// tile_size) * tile_size
-    tile_y = ((self.select_tile.y + + tile_size // 2) // tile_size) * tile_size 
-    return Olive(tile_x, tile_y, tile_size, weather)
-  
+  def selected_tile(self, tile_size):
+    """Grid coordinates of the tile under select_tile."""
+    return ((self.select_tile.x + tile_size // 2) // tile_size,
+            (self.select_tile.y + tile_size // 2) // tile_size)
+
+  def schedule_mode_end(self, when, end):
+    # A new mode replaces the old one, end and all
+    if self.mode_timer is not None:
+      self.mode_timer.cancel()
+    self.mode_timer = scheduler.schedule(when, end)
+
   def activate_water_mode(self):
     self.image = self.water_image
-    self.water_mode_start = pygame.time.get_ticks()
+    self.water_mode_start = gameclock.get_ticks()
+    # Modes last strictly longer than their duration
+    self.schedule_mode_end(self.water_mode_start + self.water_mode_duration + 1, self.end_water_mode)
 
   def activate_remove_mode(self):
     self.image = self.remove_image
-    self.remove_mode_start = pygame.time.get_ticks()
-
-  def update(self):
-    if self.water_mode_start is not None:
-      if pygame.time.get_ticks() - self.water_mode_start > self.water_mode_duration:
-        self.water_mode_start = None
-        self.image = self.normal_image
-    if self.remove_mode_start is not None: 
-      if pygame.time.get_ticks() - self.remove_mode_start > self.remove_mode_duration:
-        self.remove_mode_start = None
-        self.image = self.normal_image
+    self.remove_mode_start = gameclock.get_ticks()
+    self.schedule_mode_end(self.remove_mode_start + self.remove_mode_duration + 1, self.end_remove_mode)
+
+  def end_water_mode(self):
+    self.water_mode_start = None
+    self.mode_timer = None
+    self.image = self.normal_image
+
+  def end_remove_mode(self):
+    self.remove_mode_start = None
+    self.mode_timer = None
+    self.image = self.normal_image
 
   def draw(self, screen):
     # pygame.draw.rect(screen, self.color, self.rect)
-    self.update(); 
     screen.blit(self.image, self.rect)
 
   def draw_select_tile(self, screen):
     WHITE = (255, 255, 255)
-    pygame.draw.rect(screen, WHITE, self.select_tile, width=2)
+    draw_rect(screen, WHITE, self.select_tile, width=2)
     
\ No newline at end of file
@@ -0,0 +1,217 @@
+import csv
+import json
+import time
+from collections import deque
+import pygame
+
+
+class _Span:
+  __slots__ = ("profiler", "name", "start")
+
+  def __init__(self, profiler, name):
+    self.profiler = profiler
+    self.name = name
+
+  def __enter__(self):
+    self.start = time.perf_counter()
+    return self
+
+  def __exit__(self, *exc):
+    self.profiler.add(self.name, time.perf_counter() - self.start)
+    return False
+
+
+class _NoSpan:
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    return False
+
+_NO_SPAN = _NoSpan()
+
+
+class _FrameWriter:
+  """Streams recorded frames (ms per phase) to path a chunk at a time.
+
+  .json gets one array, .jsonl one object per line, anything else CSV with a
+  column per phase. A phase first seen after the CSV header went out rewrites
+  the file once with the wider header (older frames get 0).
+  """
+
+  def __init__(self, path, chunk=60):
+    self.path = path
+    self.chunk = chunk
+    self.format = "jsonl" if path.endswith(".jsonl") else "json" if path.endswith(".json") else "csv"
+    self.file = open(path, "w", newline="")
+    self.columns = None  # CSV header written so far
+    self.written = 0
+    self.pending = []
+    if self.format == "json":
+      self.file.write("[")
+
+  def add(self, row):
+    self.pending.append(row)
+    if len(self.pending) >= self.chunk:
+      self.flush()
+
+  def flush(self):
+    rows, self.pending = self.pending, []
+    if self.format == "csv":
+      columns = ["frame", "total"] + list({name: None for row in rows for name in row if name not in ("frame", "total")})
+      if self.columns is None:
+        self.columns = columns
+        csv.DictWriter(self.file, columns).writeheader()
+      elif not set(columns) <= set(self.columns):
+        self._widen(columns)
+      csv.DictWriter(self.file, self.columns, restval=0.0).writerows(rows)
+    else:
+      for row in rows:
+        if self.format == "json":
+          self.file.write(",\n" if self.written else "\n")
+        self.file.write(json.dumps(row))
+        if self.format == "jsonl":
+          self.file.write("\n")
+        self.written += 1
+    self.file.flush()
+
+  def _widen(self, columns):
+    self.file.close()
+    with open(self.path, newline="") as file:
+      old = list(csv.DictReader(file))
+    self.columns = self.columns + [name for name in columns if name not in self.columns]
+    self.file = open(self.path, "w", newline="")
+    writer = csv.DictWriter(self.file, self.columns, restval=0.0)
+    writer.writeheader()
+    writer.writerows(old)
+
+  def close(self):
+    if self.file.closed:
+      return
+    self.flush()
+    if self.format == "json":
+      self.file.write("\n]\n")
+    self.file.close()
+
+
+class FrameProfiler:
+  """Times named spans of each frame and keeps the last few hundred frames for the overlay.
+
+  Wrap a phase in `with profiler.span("name"):`; a span that runs more than once a
+  frame (e.g. once per simulation step) adds up. With record=path every frame is
+  also streamed to path (CSV, or JSON for .json/.jsonl) a chunk at a time, so a
+  long session stays small in memory; close() writes out the last chunk.
+  """
+
+  def __init__(self, history=240, enabled=True, record=None):
+    self.enabled = enabled
+    self.recorder = _FrameWriter(record) if record else None
+    self.history = deque(maxlen=history)  # (frame seconds, {phase: seconds})
+    self.phases = {}  # phase -> seconds so far this frame
+    self.names = []   # every phase seen, in first-seen order
+    self.frame_start = None
+    self.last_start = None
+    self.frame_count = 0
+    self.intervals = deque(maxlen=history)  # seconds between frame starts, waiting included
+
+  def span(self, name):
+    return _Span(self, name) if self.enabled else _NO_SPAN
+
+  def add(self, name, seconds):
+    if name not in self.phases:
+      self.phases[name] = 0.0
+      if name not in self.names:
+        self.names.append(name)
+    self.phases[name] += seconds
+
+  def begin_frame(self):
+    if self.enabled:
+      now = time.perf_counter()
+      if self.last_start is not None:
+        self.intervals.append(now - self.last_start)
+      self.last_start = now
+      self.phases = {}
+      self.frame_start = now
+
+  def end_frame(self):
+    if not self.enabled or self.frame_start is None:
+      return
+    total = time.perf_counter() - self.frame_start
+    self.frame_start = None
+    self.frame_count += 1
+    self.history.append((total, self.phases))
+    if self.recorder:
+      self.recorder.add(dict(frame=self.frame_count, total=total * 1000,
+                             **{name: seconds * 1000 for name, seconds in self.phases.items()}))
+
+  def stats(self):
+    """FPS, plus mean, 50th and 99th percentile time (ms) spent working per frame."""
+    if not self.history:
+      return {"fps": 0.0, "mean": 0.0, "p50": 0.0, "p99": 0.0}
+    times = sorted(total * 1000 for total, phases in self.history)
+    mean = sum(times) / len(times)
+    interval = sum(self.intervals) / len(self.intervals) if self.intervals else 0.0
+    return {
+      "fps": 1 / interval if interval else 0.0,
+      "mean": mean,
+      "p50": times[len(times) // 2],
+      "p99": times[min(len(times) - 1, int(len(times) * 0.99))],
+    }
+
+  def phase_means(self):
+    """Mean ms per frame of every phase over the history, slowest first."""
+    sums = dict.fromkeys(self.names, 0.0)
+    for total, phases in self.history:
+      for name, seconds in phases.items():
+        sums[name] += seconds
+    frames = max(1, len(self.history))
+    return sorted(((name, seconds * 1000 / frames) for name, seconds in sums.items()), key=lambda item: -item[1])
+
+  def close(self):
+    """Finish the recording, if any; safe to call more than once."""
+    if self.recorder:
+      self.recorder.close()
+
+  def render_overlay(self, font, width=360, budget_ms=1000 / 60):
+    """Panel with a frame-time histogram (one bar per frame, red over budget) and the phase breakdown."""
+    means = self.phase_means()
+    line = font.get_linesize()
+    graph_height = 60
+    panel = pygame.Surface((width, graph_height + line * (2 + len(means)) + 12), pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 170))
+
+    # Histogram of the last frames, scaled so twice the budget fills the graph
+    scale = graph_height / (2 * budget_ms)
+    bars = list(self.history)[-(width - 12):]
+    for x, (total, phases) in enumerate(bars):
+      height = min(graph_height, int(total * 1000 * scale))
+      color = (230, 60, 60) if total * 1000 > budget_ms else (90, 220, 90)
+      pygame.draw.line(panel, color, (6 + x, 6 + graph_height), (6 + x, 6 + graph_height - height))
+    budget_y = 6 + graph_height - int(budget_ms * scale)
+    pygame.draw.line(panel, (255, 255, 255), (6, budget_y), (width - 6, budget_y))
+
+    white = (255, 255, 255)
+    stats = self.stats()
+    summary = f"{stats['fps']:.0f} FPS   work mean {stats['mean']:.1f}  p50 {stats['p50']:.1f}  p99 {stats['p99']:.1f} ms"
+    panel.blit(font.render(summary, True, white), (6, graph_height + 10))
+    y = graph_height + 10 + line * 2
+    for name, ms in means:
+      panel.blit(font.render(name, True, white), (6, y))
+      value = font.render(f"{ms:.2f} ms", True, white)
+      panel.blit(value, (width - 6 - value.get_width(), y))
+      y += line
+    return panel
+
+
+# Code being profiled opens spans through span(); main installs an enabled profiler.
+_profiler = FrameProfiler(enabled=False)
+
+def use_profiler(profiler):
+  global _profiler
+  _profiler = profiler
+
+def get_profiler():
+  return _profiler
+
+def span(name):
+  return _profiler.span(name)
@@ -0,0 +1,215 @@
+from collections import OrderedDict
+import pygame
+
+class DirtyRects:
+  """Collects the regions of the game surface that changed since the last frame."""
+
+  def __init__(self):
+    self.rects = []
+    self.previous = {}  # key -> (rect, state) as drawn last frame
+    self.seen = set()
+    self.full = True
+
+  def invalidate(self):
+    """Force the next frame to be presented in full (e.g. after a resize)."""
+    self.full = True
+
+  def add(self, rect):
+    self.rects.append(pygame.Rect(rect))
+
+  def track(self, key, rect, state=None):
+    """Mark a sprite dirty if it moved or its state (image, text...) changed."""
+    rect = pygame.Rect(rect)
+    self.seen.add(key)
+    old = self.previous.get(key)
+    if old is None:
+      self.rects.append(rect)
+    elif old[0] != rect or old[1] != state:
+      self.rects.append(old[0])
+      self.rects.append(rect)
+    self.previous[key] = (rect, state)
+
+  def collect(self, bounds):
+    """Return the merged dirty rects clipped to bounds, or None when a full flip is due."""
+    # Whatever was drawn last frame but not this frame has to be erased
+    for key in list(self.previous):
+      if key not in self.seen:
+        self.rects.append(self.previous.pop(key)[0])
+    self.seen = set()
+
+    rects, self.rects = self.rects, []
+    if self.full:
+      self.full = False
+      return None
+
+    bounds = pygame.Rect(bounds)
+    merged = []
+    for rect in rects:
+      rect = rect.clip(bounds)
+      if rect.width == 0 or rect.height == 0:
+        continue
+      # Fold overlapping rects together so each pixel is pushed once
+      index = rect.collidelist(merged)
+      while index != -1:
+        rect.union_ip(merged.pop(index))
+        index = rect.collidelist(merged)
+      merged.append(rect)
+    return merged
+
+
+class Renderer:
+  """Draws game-space sprites straight onto the window at the current letterbox scale.
+
+  The scale factor and viewport are worked out once per resize, and every
+  sprite is scaled once per resize and reused until the next one. Scaled
+  copies live in an LRU of max_cached entries; one-off surfaces are blitted
+  as transient and never enter it.
+  """
+
+  def __init__(self, screen, base_size, border_color=(0, 0, 0), max_cached=512):
+    self.base_width, self.base_height = base_size
+    self.border_color = border_color
+    self.max_cached = max_cached
+    self.scaled = OrderedDict()  # id(surface) -> (surface, scaled surface), least recently used first
+    self.offset = (0, 0)  # game coordinates of the window's top-left, moved by the camera
+    self.resize(screen)
+
+  def resize(self, screen):
+    self.screen = screen
+    window_width, window_height = screen.get_size()
+    # Uniform scale factor so tiles remain square
+    self.scale = min(window_width / self.base_width, window_height / self.base_height)
+    width = int(self.base_width * self.scale)
+    height = int(self.base_height * self.scale)
+    # Center the game on the window (adding letterboxing if necessary)
+    self.viewport = pygame.Rect((window_width - width) // 2, (window_height - height) // 2, width, height)
+    self.scaled.clear()
+    self.needs_clear = True
+
+  def invalidate(self):
+    """Repaint the letterbox borders on the next frame (something else drew over them)."""
+    self.needs_clear = True
+
+  def set_offset(self, offset):
+    """Scroll the view so game position offset lands on the top-left of the viewport."""
+    self.offset = (int(offset[0]), int(offset[1]))
+
+  def to_screen(self, rect):
+    rect = pygame.Rect(rect).move(-self.offset[0], -self.offset[1])
+    left = self.viewport.x + int(round(rect.left * self.scale))
+    top = self.viewport.y + int(round(rect.top * self.scale))
+    right = self.viewport.x + int(round(rect.right * self.scale))
+    bottom = self.viewport.y + int(round(rect.bottom * self.scale))
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+  def to_game(self, pos):
+    """Convert a window position (e.g. the mouse) into game coordinates."""
+    return (int((pos[0] - self.viewport.x) / self.scale) + self.offset[0],
+            int((pos[1] - self.viewport.y) / self.scale) + self.offset[1])
+
+  def image(self, surface, transient=False):
+    """Return surface scaled to the current resolution, scaling it only once unless it is transient."""
+    if self.scale == 1:
+      return surface
+    entry = self.scaled.get(id(surface))
+    if entry is not None:
+      self.scaled.move_to_end(id(surface))
+      return entry[1]
+    width, height = surface.get_size()
+    size = (max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale))))
+    scaled = pygame.transform.scale(surface, size)
+    if not transient:
+      self.scaled[id(surface)] = (surface, scaled)
+      if len(self.scaled) > self.max_cached:
+        self.scaled.popitem(last=False)
+    return scaled
+
+  def release_image(self, surface):
+    """Forget the scaled copy of a surface that is going away (e.g. an evicted map chunk)."""
+    self.scaled.pop(id(surface), None)
+
+  def invalidate_image(self, surface):
+    """Refresh the scaled copy of a surface whose pixels changed."""
+    entry = self.scaled.get(id(surface))
+    if entry is not None and self.scale != 1:
+      # Rescale into the existing buffer rather than allocating a new one
+      pygame.transform.scale(surface, entry[1].get_size(), entry[1])
+
+  def begin_frame(self):
+    if self.needs_clear:
+      self.screen.set_clip(None)
+      self.screen.fill(self.border_color)
+      self.needs_clear = False
+    # Sprites flying in from off-screen must not spill into the borders
+    self.screen.set_clip(self.viewport)
+
+  def blit(self, surface, dest, transient=False):
+    """Draw surface at dest (game coordinates); transient ones (drawn once, then thrown away) aren't cached."""
+    if isinstance(dest, pygame.Rect):
+      dest = dest.topleft
+    return self.screen.blit(self.image(surface, transient), self.to_screen((dest[0], dest[1], 0, 0)).topleft)
+
+  def fill(self, color, rect=None):
+    return self.screen.fill(color, self.viewport if rect is None else self.to_screen(rect))
+
+  def draw_rect(self, color, rect, width=0):
+    if width:
+      width = max(1, int(round(width * self.scale)))
+    return pygame.draw.rect(self.screen, color, self.to_screen(rect), width)
+
+  def present(self, rects=None):
+    """Flip the whole window, or push only the given game-space rects."""
+    self.screen.set_clip(None)
+    if rects is None:
+      pygame.display.flip()
+    else:
+      # Pad by a pixel so rounding at the scaled edges never leaves seams
+      pygame.display.update([self.to_screen(rect).inflate(2, 2).clip(self.viewport) for rect in rects])
+
+
+def draw_rect(target, color, rect, width=0):
+  """pygame.draw.rect that also accepts a Renderer as its target."""
+  if isinstance(target, Renderer):
+    return target.draw_rect(color, rect, width)
+  return pygame.draw.rect(target, color, rect, width)
+
+
+class SurfaceCache:
+  """Small LRU of pre-rendered surfaces such as text labels and menu panels."""
+
+  def __init__(self, max_entries=256, on_evict=None):
+    self.max_entries = max_entries
+    self.on_evict = on_evict  # called with each surface pushed out of the cache
+    self.entries = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key, build):
+    """Return the surface cached under key, calling build() to make it on a miss."""
+    surface = self.entries.get(key)
+    if surface is not None:
+      self.entries.move_to_end(key)
+      self.hits += 1
+      return surface
+    self.misses += 1
+    surface = build()
+    self.entries[key] = surface
+    if len(self.entries) > self.max_entries:
+      evicted = self.entries.popitem(last=False)[1]
+      if self.on_evict is not None:
+        self.on_evict(evicted)
+    return surface
+
+  def peek(self, key):
+    """The surface cached under key, or None, without counting a hit or refreshing it."""
+    return self.entries.get(key)
+
+  def render_text(self, font, text, color, antialias=True):
+    """font.render that only runs when this (font, text, colour) was not seen recently."""
+    return self.get((font, text, color, antialias), lambda: font.render(text, antialias, color))
+
+  def clear(self):
+    if self.on_evict is not None:
+      for surface in self.entries.values():
+        self.on_evict(surface)
+    self.entries.clear()
@@ -0,0 +1,127 @@
+"""Record a session's input to a compact binary file and play it back exactly.
+
+The engine only reads randomness from `random` (seeded per round) and time from
+its SimClock, so the round seeds plus every frame's inputs and length are
+enough to rebuild a session step for step:
+
+  python main.py --record=session.oqd     # play, recording
+  python main.py --replay=session.oqd     # watch it again at real speed
+  python main.py --replay=session.oqd --fast --profile=frames.csv
+  python replay.py session.oqd            # headless, as fast as possible
+"""
+import struct
+import sys
+from engine import GameState, Inputs, KeyState
+
+MAGIC = b"OQDR"
+VERSION = 1
+
+# magic, version, columns, rows, tile_size, view width and height, max_steps (0 = no cap), disease spread
+HEADER = struct.Struct("<4sHHHHHHHB")
+# Every record starts with a tag byte
+ROUND, START, FRAME = 1, 2, 3
+ROUND_RECORD = struct.Struct("<QI")    # seed, total_time
+FRAME_RECORD = struct.Struct("<dBBB")  # frame ms, held keys, pressed keys, clicks
+KEY = struct.Struct("<I")
+CLICK = struct.Struct("<ii")
+
+
+class Recorder:
+  """Appends a game's rounds and per-frame inputs to path."""
+
+  def __init__(self, path, game):
+    self.file = open(path, "wb")
+    max_steps = game.timestep.max_steps
+    self.file.write(HEADER.pack(MAGIC, VERSION, game.columns, game.rows, game.tile_size,
+                                game.view_size[0], game.view_size[1], max_steps or 0, game.disease_spread))
+
+  def round(self, seed, total_time):
+    self.file.write(bytes((ROUND,)) + ROUND_RECORD.pack(seed, total_time))
+
+  def start(self):
+    self.file.write(bytes((START,)))
+
+  def frame(self, inputs, frame_ms):
+    held = sorted(inputs.held)
+    record = [bytes((FRAME,)), FRAME_RECORD.pack(frame_ms, len(held), len(inputs.pressed), len(inputs.clicks))]
+    record += [KEY.pack(key) for key in held]
+    record += [KEY.pack(key) for key in inputs.pressed]
+    record += [CLICK.pack(*pos) for pos in inputs.clicks]
+    self.file.write(b"".join(record))
+
+  def close(self):
+    self.file.close()
+
+
+class Replay:
+  """A recorded session; iterating yields ("round", seed, total_time), ("start",) and ("frame", inputs, frame_ms)."""
+
+  def __init__(self, path):
+    with open(path, "rb") as file:
+      self.data = file.read()
+    (magic, version, self.columns, self.rows, self.tile_size,
+     view_width, view_height, max_steps, spread) = HEADER.unpack_from(self.data)
+    if magic != MAGIC or version != VERSION:
+      raise ValueError(f"{path} is not a version {VERSION} recording")
+    self.view_size = (view_width, view_height)
+    self.max_steps = max_steps or None
+    self.disease_spread = bool(spread)
+
+  def new_game(self, **kwargs):
+    """A GameState set up like the recorded one."""
+    game = GameState(self.columns, self.rows, self.tile_size, view_size=self.view_size,
+                     disease_spread=self.disease_spread, **kwargs)
+    game.timestep.max_steps = self.max_steps
+    return game
+
+  def __iter__(self):
+    data = self.data
+    offset = HEADER.size
+    while offset < len(data):
+      tag = data[offset]
+      offset += 1
+      if tag == ROUND:
+        seed, total_time = ROUND_RECORD.unpack_from(data, offset)
+        offset += ROUND_RECORD.size
+        yield ("round", seed, total_time)
+      elif tag == START:
+        yield ("start",)
+      elif tag == FRAME:
+        frame_ms, held_count, pressed_count, click_count = FRAME_RECORD.unpack_from(data, offset)
+        offset += FRAME_RECORD.size
+        keys = [KEY.unpack_from(data, offset + i * KEY.size)[0] for i in range(held_count + pressed_count)]
+        offset += KEY.size * (held_count + pressed_count)
+        clicks = [CLICK.unpack_from(data, offset + i * CLICK.size) for i in range(click_count)]
+        offset += CLICK.size * click_count
+        yield ("frame", Inputs(KeyState(keys[:held_count]), keys[held_count:], clicks), frame_ms)
+      else:
+        raise ValueError(f"bad record tag {tag} at byte {offset - 1}")
+
+  def play(self, game, event):
+    """Apply one recorded event to game."""
+    if event[0] == "round":
+      game.reset(seed=event[1], total_time=event[2])
+    elif event[0] == "start":
+      game.start()
+    else:
+      game.step(event[1], event[2])
+
+
+def main(path):
+  import time
+  import assets
+  assets.set_headless()
+  replay = Replay(path)
+  game = replay.new_game()
+  frames = 0
+  start = time.perf_counter()
+  for event in replay:
+    replay.play(game, event)
+    frames += event[0] == "frame"
+  elapsed = time.perf_counter() - start
+  print(f"{frames} frames in {elapsed:.2f} s; score {game.score}, {len(game.orchard)} trees, "
+        f"{len(game.swarm)} insects, game over: {game.game_over}")
+
+
+if __name__ == "__main__":
+  main(sys.argv[1])
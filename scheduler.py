@@ -0,0 +1,67 @@
+import heapq
+
+
+class Timer:
+  """Handle on one scheduled callback; cancel() stops it from firing."""
+
+  __slots__ = ("when", "callback", "args", "cancelled")
+
+  def __init__(self, when, callback, args):
+    self.when = when
+    self.callback = callback
+    self.args = args
+    self.cancelled = False
+
+  def cancel(self):
+    self.cancelled = True
+
+
+class Scheduler:
+  """Heap of timed callbacks in simulation milliseconds.
+
+  Each step only pops what is due; events due at the same time fire in the
+  order they were scheduled. Cancelled timers stay in the heap until they
+  come up and are skipped then.
+  """
+
+  def __init__(self):
+    self.heap = []
+    self.sequence = 0  # tie-break so equal times keep scheduling order
+
+  def __len__(self):
+    return len(self.heap)
+
+  def schedule(self, when, callback, *args):
+    """Call callback(*args) once the simulation reaches when; returns a Timer."""
+    timer = Timer(when, callback, args)
+    heapq.heappush(self.heap, (when, self.sequence, timer))
+    self.sequence += 1
+    return timer
+
+  def run_due(self, now):
+    """Fire every timer due at or before now, including ones scheduled while running."""
+    fired = 0
+    heap = self.heap
+    while heap and heap[0][0] <= now:
+      timer = heapq.heappop(heap)[2]
+      if not timer.cancelled:
+        timer.callback(*timer.args)
+        fired += 1
+    return fired
+
+  def clear(self):
+    """Cancel everything pending, so handles kept on the old timers read as cancelled."""
+    for when, sequence, timer in self.heap:
+      timer.cancel()
+    self.heap = []
+
+
+# Game objects schedule through schedule(); the engine installs the scheduler of the running round.
+_scheduler = Scheduler()
+
+def use_scheduler(scheduler):
+  global _scheduler
+  _scheduler = scheduler
+
+def schedule(when, callback, *args):
+  return _scheduler.schedule(when, callback, *args)
@@ -0,0 +1,385 @@
+"""Save and load a round as a compact, versioned binary snapshot.
+
+Everything is packed with struct and raw little-endian NumPy arrays, never
+pickled: the orchard and swarm arrays, the player, weather and timers, the
+pending scheduled events and the random generators, so a loaded round carries
+on exactly as the saved one would have. Surfaces are not saved; they come
+back from the asset cache.
+
+capture() copies the state on the game thread (a few array copies, even for
+a 100k-tree orchard), and Autosaver packs, compresses and writes that copy on
+a background thread, so saving never holds up a frame.
+"""
+import os
+import queue
+import random
+import struct
+import threading
+import zlib
+import numpy as np
+from assets import load_image
+from orchard import OliveView, _FIELDS as ORCHARD_FIELDS
+from spread import spread_factor
+from swarm import _FIELDS as SWARM_FIELDS
+
+MAGIC = b"OQDS"
+VERSION = 4
+
+# magic, version, columns, rows, tile_size, disease spread; the rest is zlib-compressed
+HEADER = struct.Struct("<4sHHHHB")
+# clock time, timestep accumulator, start_time, total_time, spawn timers, score, steps, insects killed,
+# protections, game over
+GAME = struct.Struct("<ddqqqqqqqiB")
+WEATHER = struct.Struct("<iq")          # temperature, last update
+PLAYER = struct.Struct("<iiiiqq")       # position, selected tile position, water and remove mode starts (-1 = off)
+RANDOM = struct.Struct("<625IBd")       # Mersenne Twister state, has a cached gauss, the gauss
+SPREAD_RNG = struct.Struct("<16s16sBI")  # PCG64 state and increment, has_uint32, uinteger
+COUNTS = struct.Struct("<qqq")          # count, next serial or id, steps
+EVENT = struct.Struct("<qBI")           # when, kind, argument count
+COUNT = struct.Struct("<I")
+
+# Everything the round ever schedules, as (owner, method); the index is stored
+EVENTS = (
+  ("game", "spawn_insect"), ("game", "spawn_mutant_insect"),
+  ("game", "update_weather"), ("game", "spread_disease"),
+  ("orchard", "remove"), ("orchard", "make_solid"),
+  ("player", "end_water_mode"), ("player", "end_remove_mode"),
+  ("swarm", "depart"),
+)
+INSECT_IMAGES = ("images/insect.png", "images/mutant_insect.png")
+
+
+def _owners(game):
+  return {"game": game, "orchard": game.orchard, "player": game.player, "swarm": game.swarm}
+
+def _event_kind(owners, callback):
+  owner = getattr(callback, "__self__", None)
+  for name, obj in owners.items():
+    if owner is obj and (name, callback.__name__) in EVENTS:
+      return EVENTS.index((name, callback.__name__))
+  raise ValueError(f"can't save a scheduled {callback!r}")
+
+def _flatten(args):
+  # Tiles and ids all become a flat run of ints
+  values = []
+  for arg in args:
+    if isinstance(arg, (tuple, list, np.ndarray)):
+      values.extend(int(value) for value in arg)
+    else:
+      values.append(int(arg))
+  return values
+
+def _unflatten(method, values):
+  if method == "remove":
+    return ((values[0], values[1]),)
+  if method == "make_solid":
+    return ((values[0], values[1]),)
+  if method == "depart":
+    return (values[0],)
+  return ()
+
+def _keep_handle(owners, method, args, timer):
+  # Owners hold on to their timers so they can cancel them
+  if method == "remove":
+    owners["orchard"].removal_timers[args[0]] = timer
+  elif method == "make_solid":
+    owners["orchard"].solid_timers[args[0]] = timer
+  elif method == "depart":
+    owners["swarm"].departures[args[0]] = timer
+  elif method in ("end_water_mode", "end_remove_mode"):
+    owners["player"].mode_timer = timer
+
+def _pack_arrays(arrays, fields):
+  return b"".join(arrays[name].astype(np.dtype(dtype).newbyteorder("<")).tobytes() for name, dtype in fields)
+
+def _unpack_arrays(data, offset, count, fields):
+  arrays = {}
+  for name, dtype in fields:
+    wire = np.dtype(dtype).newbyteorder("<")
+    arrays[name] = np.frombuffer(data, wire, count, offset).astype(dtype)
+    offset += wire.itemsize * count
+  return arrays, offset
+
+
+class Snapshot:
+  """A copy of one round's state, detached from the live game."""
+
+  def pack(self):
+    """The snapshot as bytes; safe to call from another thread."""
+    body = [GAME.pack(self.clock_time, self.accumulator, self.start_time, self.total_time,
+                      self.insect_spawn_timer, self.mutant_insect_spawn_timer,
+                      self.score, self.steps, self.insects_killed, self.protections, self.game_over),
+            WEATHER.pack(*self.weather),
+            PLAYER.pack(*self.player),
+            RANDOM.pack(*self.random[1], self.random[2] is not None, self.random[2] or 0.0)]
+    if self.spread_rng is not None:
+      state = self.spread_rng["state"]
+      body.append(SPREAD_RNG.pack(state["state"].to_bytes(16, "little"), state["inc"].to_bytes(16, "little"),
+                                  self.spread_rng["has_uint32"], self.spread_rng["uinteger"]))
+
+    body.append(COUNTS.pack(self.orchard_count, self.next_serial, 0))
+    body.append(_pack_arrays(self.orchard, ORCHARD_FIELDS))
+    body.append(bytes(self.grid))
+
+    body.append(COUNTS.pack(self.swarm_count, self.next_id, self.swarm_steps))
+    body.append(_pack_arrays(self.swarm, SWARM_FIELDS))
+    body.append(self.targets.astype("<i8").tobytes())
+    body.append(COUNT.pack(len(self.target_order)) + self.target_order.astype("<i8").tobytes())
+
+    body.append(COUNT.pack(len(self.events)))
+    for when, kind, values in self.events:
+      body.append(EVENT.pack(when, kind, len(values)))
+      body.append(struct.pack(f"<{len(values)}q", *values))
+    body.append(COUNT.pack(len(self.waiting)) + bytes(self.waiting))
+
+    header = HEADER.pack(MAGIC, VERSION, self.columns, self.rows, self.tile_size, self.disease_spread)
+    return header + zlib.compress(b"".join(body), 1)
+
+  @classmethod
+  def unpack(cls, data):
+    """The Snapshot packed in data; raises ValueError if it isn't a readable one."""
+    try:
+      return cls._unpack(data)
+    except (zlib.error, struct.error) as error:
+      # Truncated or corrupt files fail deep in the parsing
+      raise ValueError(f"corrupt snapshot: {error}") from error
+
+  @classmethod
+  def _unpack(cls, data):
+    magic, version, columns, rows, tile_size, spread = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+      raise ValueError(f"not a version {VERSION} snapshot")
+    data = zlib.decompress(data[HEADER.size:])
+    self = cls()
+    self.columns, self.rows, self.tile_size, self.disease_spread = columns, rows, tile_size, bool(spread)
+
+    (self.clock_time, self.accumulator, self.start_time, self.total_time,
+     self.insect_spawn_timer, self.mutant_insect_spawn_timer,
+     self.score, self.steps, self.insects_killed, self.protections, game_over) = GAME.unpack_from(data)
+    self.game_over = bool(game_over)
+    offset = GAME.size
+    self.weather = WEATHER.unpack_from(data, offset)
+    offset += WEATHER.size
+    self.player = PLAYER.unpack_from(data, offset)
+    offset += PLAYER.size
+    state = RANDOM.unpack_from(data, offset)
+    self.random = (3, state[:625], state[626] if state[625] else None)
+    offset += RANDOM.size
+    self.spread_rng = None
+    if self.disease_spread:
+      rng_state, inc, has_uint32, uinteger = SPREAD_RNG.unpack_from(data, offset)
+      self.spread_rng = {"bit_generator": "PCG64",
+                         "state": {"state": int.from_bytes(rng_state, "little"), "inc": int.from_bytes(inc, "little")},
+                         "has_uint32": has_uint32, "uinteger": uinteger}
+      offset += SPREAD_RNG.size
+
+    self.orchard_count, self.next_serial, _ = COUNTS.unpack_from(data, offset)
+    self.orchard, offset = _unpack_arrays(data, offset + COUNTS.size, self.orchard_count, ORCHARD_FIELDS)
+    self.grid = bytearray(data[offset:offset + columns * rows])
+    offset += columns * rows
+
+    self.swarm_count, self.next_id, self.swarm_steps = COUNTS.unpack_from(data, offset)
+    self.swarm, offset = _unpack_arrays(data, offset + COUNTS.size, self.swarm_count, SWARM_FIELDS)
+    self.targets = np.frombuffer(data, "<i8", self.swarm_count * 3, offset).reshape(-1, 3)
+    offset += self.swarm_count * 3 * 8
+    (count,) = COUNT.unpack_from(data, offset)
+    self.target_order = np.frombuffer(data, "<i8", count, offset + COUNT.size)
+    offset += COUNT.size + count * 8
+
+    self.events = []
+    (count,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for i in range(count):
+      when, kind, length = EVENT.unpack_from(data, offset)
+      offset += EVENT.size
+      self.events.append((when, kind, struct.unpack_from(f"<{length}q", data, offset)))
+      offset += 8 * length
+    (count,) = COUNT.unpack_from(data, offset)
+    self.waiting = list(data[offset + COUNT.size:offset + COUNT.size + count])
+    return self
+
+  def restore(self, game):
+    """Turn game into the saved round; it must have the same world size.
+
+    The save is authoritative: disease spread comes back on or off the way
+    it was saved, whatever game was started with.
+    """
+    if (game.columns, game.rows, game.tile_size) != (self.columns, self.rows, self.tile_size):
+      raise ValueError(f"snapshot is of a {self.columns}x{self.rows} world, not {game.columns}x{game.rows}")
+    game.disease_spread = self.disease_spread
+    game.clock.time = self.clock_time
+    # A fresh round to fill in; the saved events replace the ones it schedules
+    game.reset(total_time=self.total_time)
+    game.scheduler.clear()
+    game.timestep.accumulator = self.accumulator
+    game.start_time = self.start_time
+    game.insect_spawn_timer = self.insect_spawn_timer
+    game.mutant_insect_spawn_timer = self.mutant_insect_spawn_timer
+    game.score, game.steps, game.protections, game.game_over = self.score, self.steps, self.protections, self.game_over
+    game.insects_killed = self.insects_killed
+    game.weather.temperature, game.weather.last_update = self.weather
+
+    orchard = game.orchard
+    for name, dtype in ORCHARD_FIELDS:
+      array = np.zeros(max(64, self.orchard_count), dtype)
+      array[:self.orchard_count] = self.orchard[name]
+      setattr(orchard, name, array)
+    orchard.count, orchard.next_serial = self.orchard_count, self.next_serial
+    # The index keeps planting order, like the live one
+    order = np.argsort(orchard.serial[:orchard.count], kind="stable")
+    orchard.index = {(int(orchard.tile_x[slot]), int(orchard.tile_y[slot])): int(slot) for slot in order}
+    orchard.grid.cells = bytearray(self.grid)
+    # Random target picks depend on the order the index holds its trees in
+    game.targets.rebuild(orchard, [int(serial) for serial in self.target_order])
+    if orchard.slot_grid is not None:
+      orchard.slot_grid = None
+      orchard.track_slots(game.columns, game.rows)
+
+    swarm = game.swarm
+    capacity = max(64, self.swarm_count)
+    for name, dtype in SWARM_FIELDS:
+      array = np.zeros(capacity, dtype)
+      array[:self.swarm_count] = self.swarm[name]
+      setattr(swarm, name, array)
+    swarm.targets = np.empty(capacity, object)
+    for i, (x, y, serial) in enumerate(self.targets):
+      if serial >= 0:
+        swarm.targets[i] = OliveView(orchard, (int(x), int(y)), int(serial))
+    swarm.count, swarm.next_id, swarm.steps = self.swarm_count, self.next_id, self.swarm_steps
+    for species in np.unique(swarm.species[:swarm.count]):
+      swarm.images[int(species)] = load_image(INSECT_IMAGES[species], (swarm.size, swarm.size))
+    swarm.spatial_stale = True
+
+    player = game.player
+    x, y, select_x, select_y, water_start, remove_start = self.player
+    player.rect.topleft = (x, y)
+    player.select_tile.topleft = (select_x, select_y)
+    player.water_mode_start = None if water_start < 0 else water_start
+    player.remove_mode_start = None if remove_start < 0 else remove_start
+    if player.water_mode_start is not None:
+      player.image = player.water_image
+    elif player.remove_mode_start is not None:
+      player.image = player.remove_image
+    game.camera.follow(player.rect)
+
+    if game.spread is not None:
+      game.spread.rng.bit_generator.state = self.spread_rng
+      game.spread.factor = spread_factor(game.weather.temperature)
+
+    owners = _owners(game)
+    for when, kind, values in self.events:
+      owner, method = EVENTS[kind]
+      args = _unflatten(method, values)
+      _keep_handle(owners, method, args, game.scheduler.schedule(when, getattr(owners[owner], method), *args))
+    game.spawns_waiting = [getattr(game, EVENTS[kind][1]) for kind in self.waiting]
+    random.setstate(self.random)
+    return game
+
+
+def capture(game):
+  """Copy game's state into a Snapshot; cheap enough to do between frames."""
+  snapshot = Snapshot()
+  snapshot.columns, snapshot.rows, snapshot.tile_size = game.columns, game.rows, game.tile_size
+  snapshot.disease_spread = game.spread is not None
+  snapshot.clock_time = float(game.clock.time)
+  snapshot.accumulator = game.timestep.accumulator
+  snapshot.start_time, snapshot.total_time = game.start_time, game.total_time
+  snapshot.insect_spawn_timer = game.insect_spawn_timer
+  snapshot.mutant_insect_spawn_timer = game.mutant_insect_spawn_timer
+  snapshot.score, snapshot.steps, snapshot.protections = game.score, game.steps, game.protections
+  snapshot.insects_killed = game.insects_killed
+  snapshot.game_over = game.game_over
+  snapshot.weather = (game.weather.temperature, game.weather.last_update)
+  player = game.player
+  snapshot.player = (player.rect.x, player.rect.y, player.select_tile.x, player.select_tile.y,
+                     -1 if player.water_mode_start is None else player.water_mode_start,
+                     -1 if player.remove_mode_start is None else player.remove_mode_start)
+  snapshot.random = random.getstate()
+  snapshot.spread_rng = game.spread.rng.bit_generator.state if game.spread is not None else None
+
+  orchard = game.orchard
+  snapshot.orchard_count, snapshot.next_serial = orchard.count, orchard.next_serial
+  snapshot.orchard = {name: getattr(orchard, name)[:orchard.count].copy() for name, dtype in ORCHARD_FIELDS}
+  snapshot.grid = bytes(orchard.grid.cells)
+
+  swarm = game.swarm
+  snapshot.swarm_count, snapshot.next_id, snapshot.swarm_steps = swarm.count, swarm.next_id, swarm.steps
+  snapshot.swarm = {name: getattr(swarm, name)[:swarm.count].copy() for name, dtype in SWARM_FIELDS}
+  # Targets are saved as the tile and serial of the tree (serial -1 = none)
+  snapshot.targets = np.full((swarm.count, 3), -1, np.int64)
+  for i, target in enumerate(swarm.targets[:swarm.count]):
+    if target is not None:
+      snapshot.targets[i] = (target.tile[0], target.tile[1], target.serial)
+
+  snapshot.target_order = np.array(game.targets.serials, np.int64)
+
+  owners = _owners(game)
+  snapshot.events = [(int(when), _event_kind(owners, timer.callback), _flatten(timer.args))
+                     for when, sequence, timer in sorted(game.scheduler.heap, key=lambda entry: entry[:2])
+                     if not timer.cancelled]
+  snapshot.waiting = [_event_kind(owners, spawn) for spawn in game.spawns_waiting]
+  return snapshot
+
+
+def write(path, data):
+  # Write next to the old save and swap, so a crash never leaves half a file
+  temporary = path + ".tmp"
+  with open(temporary, "wb") as file:
+    file.write(data)
+  os.replace(temporary, path)
+
+def save(game, path):
+  write(path, capture(game).pack())
+
+def load(game, path):
+  with open(path, "rb") as file:
+    return Snapshot.unpack(file.read()).restore(game)
+
+
+class Autosaver:
+  """Saves the round to path every interval ms of game time, packing and writing on a background thread.
+
+  Only capture() runs on the caller's thread. If the previous save is still
+  being written, the next one is skipped rather than queued up.
+  """
+
+  def __init__(self, path, interval=30000):
+    self.path = path
+    self.interval = interval
+    self.last_save = None
+    self.error = None  # last OSError from the writer, if any
+    self.queue = queue.Queue(maxsize=1)
+    self.thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+    self.thread.start()
+
+  def update(self, game):
+    """Call once a frame; saves when the interval is up."""
+    now = game.clock.get_ticks()
+    if self.last_save is None or now < self.last_save:
+      self.last_save = now  # first call, or a loaded round moved the clock back
+    if now - self.last_save >= self.interval and not game.game_over:
+      self.save(game)
+
+  def save(self, game):
+    """Save right away; returns False if a save was already waiting to be written."""
+    self.last_save = game.clock.get_ticks()
+    try:
+      self.queue.put_nowait(capture(game))
+    except queue.Full:
+      return False
+    return True
+
+  def _run(self):
+    while True:
+      snapshot = self.queue.get()
+      if snapshot is None:
+        return
+      try:
+        write(self.path, snapshot.pack())
+      except OSError as error:
+        self.error = error
+
+  def close(self):
+    """Finish any save in progress and stop the thread."""
+    self.queue.put(None)
+    self.thread.join()
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+class SpatialHash:
+  """Uniform grid over the screen that buckets points by cell, kept up to date as they move.
+
+  Buckets hold point ids, which must rise with the points' index (as swarm
+  ids do) so a query's ids map back to indices with one searchsorted. The
+  first count entries of cells run parallel to the caller's arrays (spare
+  capacity follows, doubled as needed), and move() re-buckets only the
+  points whose cell changed. Anything off-screen lands in the ring of border cells,
+  so queries never miss a point.
+  """
+
+  def __init__(self, width, height, cell_size):
+    self.cell_size = cell_size
+    # One extra cell on every side for points outside the screen
+    self.columns = -(-width // cell_size) + 2
+    self.rows = -(-height // cell_size) + 2
+    self.cells = np.zeros(64, np.int64)  # cell of each point, by index
+    self.count = 0
+    self.buckets = {}  # cell -> set of ids
+
+  def _cell_xy(self, x, y):
+    cx = np.clip(np.floor_divide(x, self.cell_size) + 1, 0, self.columns - 1)
+    cy = np.clip(np.floor_divide(y, self.cell_size) + 1, 0, self.rows - 1)
+    return cx.astype(np.int64), cy.astype(np.int64)
+
+  def _cells(self, x, y):
+    cx, cy = self._cell_xy(x, y)
+    return cy * self.columns + cx
+
+  def rebuild(self, ids, x, y):
+    """Re-bucket every point; ids, x and y are parallel arrays (positions in pixels)."""
+    cells = self._cells(x, y)
+    self.count = len(cells)
+    self.cells = np.zeros(max(64, self.count), np.int64)
+    self.cells[:self.count] = cells
+    self.buckets = {}
+    for cell, id in zip(cells.tolist(), ids.tolist()):
+      self.buckets.setdefault(cell, set()).add(id)
+
+  def add(self, id, x, y):
+    """Append a point after the existing ones."""
+    cell = int(self._cells(np.array([x]), np.array([y]))[0])
+    if self.count == len(self.cells):
+      cells = np.zeros(len(self.cells) * 2, np.int64)
+      cells[:self.count] = self.cells
+      self.cells = cells
+    self.cells[self.count] = cell
+    self.count += 1
+    self.buckets.setdefault(cell, set()).add(id)
+
+  def move(self, ids, x, y):
+    """Take the points' new positions, moving just the ones that changed cell to their new bucket."""
+    cells = self._cells(x, y)
+    current = self.cells[:self.count]
+    changed = np.flatnonzero(cells != current)
+    buckets = self.buckets
+    for old, new, id in zip(current[changed].tolist(), cells[changed].tolist(), ids[changed].tolist()):
+      bucket = buckets[old]
+      bucket.discard(id)
+      if not bucket:
+        del buckets[old]
+      buckets.setdefault(new, set()).add(id)
+    current[changed] = cells[changed]
+
+  def compact(self, ids, keep):
+    """Forget every point not in keep (sorted indices); the rest close up like the caller's arrays."""
+    current = self.cells[:self.count]
+    dropped = np.ones(self.count, bool)
+    dropped[keep] = False
+    buckets = self.buckets
+    for cell, id in zip(current[dropped].tolist(), ids[dropped].tolist()):
+      bucket = buckets[cell]
+      bucket.discard(id)
+      if not bucket:
+        del buckets[cell]
+    kept = current[keep]
+    self.count = len(kept)
+    self.cells[:self.count] = kept
+
+  def query(self, left, top, right, bottom):
+    """Ids of the points in every cell touching the box (inclusive), a superset to filter."""
+    (cx0, cx1), (cy0, cy1) = self._cell_xy(np.array([left, right]), np.array([top, bottom]))
+    buckets = self.buckets
+    found = [id for row in range(cy0 * self.columns, cy1 * self.columns + 1, self.columns)
+             for cell in range(row + cx0, row + cx1 + 1) if cell in buckets for id in buckets[cell]]
+    return np.array(found, np.int64)
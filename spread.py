@@ -0,0 +1,82 @@
+import numpy as np
+from orchard import HEALTHY, UNHEALTHY, SICK, DEAD
+
+# How much infection each status sheds onto its neighbours
+SHEDDING = np.zeros(4)
+SHEDDING[UNHEALTHY] = 0.5
+SHEDDING[SICK] = 1.0
+SHEDDING[DEAD] = 0.25  # the bacteria outlive the tree for a while
+
+PROTECTED_SHEDDING = 0.25  # protected trees still carry it, but shed much less
+SPREAD_RATE = 0.05         # infections per second per unit of pressure at the ideal temperature
+
+# 3x3 spread kernel without its centre; corner neighbours are further away than edge ones
+KERNEL_X = np.array([-1, 0, 1, -1, 1, -1, 0, 1])
+KERNEL_Y = np.array([-1, -1, -1, 0, 0, 1, 1, 1])
+KERNEL_WEIGHT = np.where(KERNEL_X * KERNEL_Y != 0, 0.5, 1.0)
+
+OPTIMAL_TEMPERATURE = 80
+
+
+def spread_factor(temperature):
+  """0.1..1 multiplier on spread: fastest at the optimal temperature, slower the further off."""
+  return max(0.1, 1 - abs(temperature - OPTIMAL_TEMPERATURE) / 40)
+
+
+class DiseaseSpread:
+  """Optional tree-to-tree spread of the infection across the orchard's tile grid.
+
+  Every interval ms the spread kernel is convolved with the infected trees:
+  each one puts pressure on its 8 neighbours, and every healthy, unprotected,
+  growing neighbour catches it with a chance that grows with the pressure and
+  the weather. The kernel is only applied around infected trees and trees are
+  found through the orchard's slot grid, so the cost follows the outbreak,
+  not the size of the orchard.
+  """
+
+  def __init__(self, orchard, columns, rows, interval=1000, seed=None):
+    self.orchard = orchard
+    self.columns = columns
+    self.rows = rows
+    self.interval = interval
+    self.rng = np.random.default_rng(seed)
+    self.factor = 1.0
+    orchard.track_slots(columns, rows)
+
+  def on_weather_change(self, temperature, infection_rate):
+    self.factor = spread_factor(temperature)
+
+  def pressure(self):
+    """(slots, pressure) of the trees that could catch the infection and have an infected neighbour."""
+    orchard = self.orchard
+    n = orchard.count
+    status = orchard.status[:n]
+    growing = orchard.growth_started[:n]
+    protected = orchard.protected[:n]
+
+    sources = np.flatnonzero(growing & (status != HEALTHY))
+    shedding = SHEDDING[status[sources]] * np.where(protected[sources], PROTECTED_SHEDDING, 1.0)
+
+    # Every source paints the kernel onto its neighbourhood
+    x = (orchard.tile_x[sources][:, None] + KERNEL_X).ravel()
+    y = (orchard.tile_y[sources][:, None] + KERNEL_Y).ravel()
+    weight = (shedding[:, None] * KERNEL_WEIGHT).ravel()
+    inside = (x >= 0) & (x < self.columns) & (y >= 0) & (y < self.rows)
+    slots = orchard.slot_grid[y[inside], x[inside]]
+    weight = weight[inside]
+
+    catchable = slots >= 0
+    slots, weight = slots[catchable], weight[catchable]
+    catchable = growing[slots] & (status[slots] == HEALTHY) & ~protected[slots]
+    slots, weight = slots[catchable], weight[catchable]
+
+    # Add up the pressure each exposed tree gets from all its infected neighbours
+    exposed, which = np.unique(slots, return_inverse=True)
+    return exposed, np.bincount(which, weights=weight, minlength=len(exposed))
+
+  def step(self, now=None):
+    """Advance one interval; returns the slots newly infected."""
+    exposed, pressure = self.pressure()
+    chance = 1 - np.exp(-SPREAD_RATE * self.factor * pressure * (self.interval / 1000.0))
+    caught = exposed[self.rng.random(len(exposed)) < chance]
+    return self.orchard.infect_many(caught, now)
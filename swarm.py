@@ -0,0 +1,277 @@
+import random
+import numpy as np
+import pygame
+from insect import Insect
+from mutantInsect import MutantInsect
+import gameclock
+import scheduler
+from spatial import SpatialHash
+
+# Species are stored as an index into these tables
+SPECIES = (Insect, MutantInsect)
+INFECT = ("infect", "mutant_infect")
+
+# Flight states
+IDLE = 0      # spawned with nothing to target, waits off-screen
+FLYING = 1    # heading for its target olive
+ARRIVED = 2   # sitting on the olive it infected
+LEAVING = 3   # flying off-screen
+DEAD = 4      # flown away or squashed, dropped at the next compaction
+
+DEPARTURE_DELAY = 2000  # ms an insect stays on an olive before leaving
+
+_FIELDS = (
+  ("x", np.float64), ("y", np.float64),
+  ("target_x", np.float64), ("target_y", np.float64),
+  ("exit_x", np.float64), ("exit_y", np.float64),
+  ("speed", np.float64), ("amplitude", np.float64), ("frequency", np.float64),
+  ("birth_time", np.float64), ("departure_time", np.float64),
+  ("state", np.int8), ("species", np.int8), ("ids", np.int64),
+  ("target_serial", np.int64),  # serial of the target tree (-1 = none)
+)
+
+
+class InsectSwarm:
+  """Every live insect of both species, kept as parallel NumPy arrays and advanced in one batch."""
+
+  def __init__(self, screen_width, screen_height, capacity=64):
+    self.screen_width = screen_width
+    self.screen_height = screen_height
+    self.size = Insect.size  # Size of an insect in pixels
+    self.count = 0
+    self.next_id = 0
+    for name, dtype in _FIELDS:
+      setattr(self, name, np.zeros(capacity, dtype))
+    self.targets = np.empty(capacity, object)  # OliveView each insect flies to (or None)
+    self.images = {}  # species -> shared sprite
+    # Insects bucketed by sprite position, moved between buckets as they fly;
+    # big worlds get bigger cells so the bucket table stays small
+    cell_size = self.size
+    while (screen_width // cell_size) * (screen_height // cell_size) > 65536:
+      cell_size *= 2
+    self.spatial = SpatialHash(screen_width, screen_height, cell_size)
+    self.steps = 0  # update() calls, for pacing insects off screen
+    self.spatial_stale = False  # set when the arrays are replaced wholesale (a loaded save)
+    self.departures = {}  # id -> pending depart timer of each insect sitting on an olive
+
+  def __len__(self):
+    return self.count
+
+  def _grow(self):
+    capacity = max(64, len(self.x) * 2)
+    for name, dtype in _FIELDS:
+      array = np.zeros(capacity, dtype)
+      array[:self.count] = getattr(self, name)[:self.count]
+      setattr(self, name, array)
+    targets = np.empty(capacity, object)
+    targets[:self.count] = self.targets[:self.count]
+    self.targets = targets
+
+  def add(self, insect):
+    """Take over an Insect or MutantInsect, keeping the random choices it made at spawn."""
+    if self.count == len(self.x):
+      self._grow()
+    i = self.count
+    species = SPECIES.index(type(insect))
+    self.x[i] = insect.pos.x
+    self.y[i] = insect.pos.y
+    self.speed[i] = insect.speed
+    self.amplitude[i] = insect.amplitude
+    self.frequency[i] = insect.frequency
+    self.birth_time[i] = insect.birth_time
+    self.species[i] = species
+    self.targets[i] = insect.target
+    self.target_serial[i] = getattr(insect.target, "serial", -1)
+    if insect.target is not None:
+      self.target_x[i], self.target_y[i] = insect.target.rect.center
+      self.state[i] = FLYING
+    else:
+      self.state[i] = IDLE
+    self.ids[i] = self.next_id
+    self.next_id += 1
+    self.images.setdefault(species, insect.image)
+    self.count += 1
+    if not self.spatial_stale:
+      self.spatial.add(int(self.ids[i]), int(self.x[i]), int(self.y[i]))
+    return self.ids[i]
+
+  def _fly(self, mask, goal_x, goal_y, since, stride):
+    """Move the insects in mask towards their goal along a sine wave, stride[k] steps for the k-th.
+
+    Returns the subset of mask that is within that distance of its goal (and was not moved).
+    """
+    dx = goal_x[mask] - self.x[mask]
+    dy = goal_y[mask] - self.y[mask]
+    distance = np.sqrt(dx * dx + dy * dy)
+    speed = self.speed[mask] * stride
+    close = distance <= speed
+
+    move = ~close
+    direction_x = dx[move] / distance[move]
+    direction_y = dy[move] / distance[move]
+    elapsed = (self.now - since[mask][move]) / 1000.0
+    offset_amount = self.amplitude[mask][move] * np.sin(elapsed * self.frequency[mask][move]) * stride[move]
+    moving = np.flatnonzero(mask)[move]
+    # Base movement along the direction plus a wave offset along its perpendicular
+    self.x[moving] += direction_x * speed[move] + -direction_y * offset_amount
+    self.y[moving] += direction_y * speed[move] + direction_x * offset_amount
+    return np.flatnonzero(mask)[close]
+
+  def _in_update_order(self, indices):
+    # Insects were updated before mutants, so random draws happen in that order
+    return indices[np.argsort(self.species[indices], kind="stable")]
+
+  def update(self, now=None, view=None, far_every=1):
+    """Advance every insect one step; returns how many flew away.
+
+    With a view (world pixels), insects off screen only move every far_every
+    steps, covering far_every steps' distance at once.
+    """
+    n = self.count
+    self.steps += 1
+    if n == 0:
+      return 0
+    self.now = gameclock.get_ticks() if now is None else now
+    state = self.state[:n]
+
+    # How many steps each insect covers this update (0 = sits this one out)
+    stride = np.zeros(len(self.x))
+    stride[:n] = 1
+    if view is not None and far_every > 1:
+      left, top = self.topleft()
+      far = ~((left < view.right) & (left + self.size > view.left) &
+              (top < view.bottom) & (top + self.size > view.top))
+      stride[:n][far] = 0 if self.steps % far_every else far_every
+
+    leaving = np.zeros(len(self.x), bool)
+    leaving[:n] = (state == LEAVING) & (stride[:n] > 0)
+    flying = np.zeros(len(self.x), bool)
+    flying[:n] = (state == FLYING) & (stride[:n] > 0)
+
+    # Flying away: anything within a step of its exit is gone
+    gone = self._fly(leaving, self.exit_x, self.exit_y, self.departure_time, stride[leaving])
+    self.state[gone] = DEAD
+
+    # Flying in: land on the olive and infect it
+    landed = self._fly(flying, self.target_x, self.target_y, self.birth_time, stride[flying])
+    self.x[landed] = self.target_x[landed]
+    self.y[landed] = self.target_y[landed]
+    self.state[landed] = ARRIVED
+    self.departure_time[landed] = self.now
+    for i in self._in_update_order(landed):
+      getattr(self.targets[i], INFECT[self.species[i]])()
+    for i in self._in_update_order(landed):
+      id = int(self.ids[i])
+      self.departures[id] = scheduler.schedule(self.now + DEPARTURE_DELAY, self.depart, id)
+    if not self.spatial_stale:
+      self.spatial.move(self.ids[:n], *self.topleft())
+
+    if len(gone):
+      self.compact()
+    return len(gone)
+
+  def retarget(self, lost, targets, orchard, now):
+    """Turn the insects flying to trees in lost (serials) towards the nearest tree left in targets.
+
+    With no trees left to go to they fly away. Returns how many were retargeted.
+    """
+    n = self.count
+    stranded = np.flatnonzero((self.state[:n] == FLYING) & np.isin(self.target_serial[:n], lost))
+    for i in self._in_update_order(stranded):
+      tile = targets.nearest(self.x[i], self.y[i])
+      if tile is None:
+        self.targets[i] = None
+        self.target_serial[i] = -1
+        self.exit_x[i], self.exit_y[i] = self.choose_exit_location()
+        self.departure_time[i] = now
+        self.state[i] = LEAVING
+      else:
+        target = orchard.view(tile)
+        self.targets[i] = target
+        self.target_x[i], self.target_y[i] = target.rect.center
+        self.target_serial[i] = target.serial
+    return len(stranded)
+
+  def depart(self, id):
+    """Scheduled DEPARTURE_DELAY after landing: send the insect off-screen."""
+    del self.departures[id]
+    # Ids rise with index
+    i = np.searchsorted(self.ids[:self.count], id)
+    self.exit_x[i], self.exit_y[i] = self.choose_exit_location()
+    self.state[i] = LEAVING
+
+  def choose_exit_location(self):
+    """Selects a random off-screen position, drawing from random like spawning does."""
+    side = random.choice(['left', 'right', 'top', 'bottom'])
+    if side == 'left':
+      return -self.size, random.randint(0, self.screen_height)
+    elif side == 'right':
+      return self.screen_width + self.size, random.randint(0, self.screen_height)
+    elif side == 'top':
+      return random.randint(0, self.screen_width), -self.size
+    else:  # 'bottom'
+      return random.randint(0, self.screen_width), self.screen_height + self.size
+
+  def compact(self):
+    """Drop dead insects in one pass, keeping the survivors in spawn order."""
+    n = self.count
+    keep = np.flatnonzero(self.state[:n] != DEAD)
+    for id in self.ids[:n][self.state[:n] == DEAD].tolist():
+      timer = self.departures.pop(id, None)
+      if timer is not None:
+        timer.cancel()
+    if not self.spatial_stale:
+      self.spatial.compact(self.ids[:n], keep)
+    for name, dtype in _FIELDS:
+      array = getattr(self, name)
+      array[:len(keep)] = array[keep]
+    self.targets[:len(keep)] = self.targets[keep]
+    self.targets[len(keep):n] = None
+    self.count = len(keep)
+
+  def topleft(self):
+    """Integer sprite positions of all live insects (truncated like Rect.topleft)."""
+    n = self.count
+    return self.x[:n].astype(np.int64), self.y[:n].astype(np.int64)
+
+  def nearby(self, left, top, right, bottom):
+    """Live insects whose sprite's top-left lies in the cells touching the box (a superset)."""
+    n = self.count
+    if self.spatial_stale:
+      self.spatial.rebuild(self.ids[:n], *self.topleft())
+      self.spatial_stale = False
+    # Ids rise with index, so each bucketed id's index is a binary search away
+    candidates = np.searchsorted(self.ids[:n], self.spatial.query(left, top, right, bottom))
+    return candidates[self.state[candidates] != DEAD]
+
+  def hit(self, pos):
+    """Squash every insect whose sprite covers pos; returns how many were hit."""
+    # Only sprites with their top-left within one sprite of pos can cover it
+    candidates = self.nearby(pos[0] - self.size + 1, pos[1] - self.size + 1, pos[0], pos[1])
+    left = self.x[candidates].astype(np.int64)
+    top = self.y[candidates].astype(np.int64)
+    hits = candidates[(left <= pos[0]) & (pos[0] < left + self.size) &
+                      (top <= pos[1]) & (pos[1] < top + self.size)]
+    if len(hits):
+      self.state[hits] = DEAD
+      self.compact()
+    return len(hits)
+
+  def visible(self, view=None):
+    """Indices of the live insects whose sprite overlaps view (world pixels), or all of them."""
+    # A view over the whole screen needs no bucket lookups (off-screen insects aren't drawn anyway)
+    if view is None or view.contains((0, 0, self.screen_width, self.screen_height)):
+      return np.arange(self.count)
+    candidates = self.nearby(view.left - self.size + 1, view.top - self.size + 1, view.right - 1, view.bottom - 1)
+    return np.sort(candidates)
+
+  def rects(self, view=None):
+    """(id, rect) pairs for every live insect (in view), e.g. for dirty-rect tracking."""
+    return [(self.ids[i], pygame.Rect(int(self.x[i]), int(self.y[i]), self.size, self.size))
+            for i in self.visible(view)]
+
+  def draw(self, screen, view=None):
+    shown = self.visible(view)
+    for species, image in self.images.items():
+      for i in shown[self.species[shown] == species]:
+        screen.blit(image, (int(self.x[i]), int(self.y[i])))
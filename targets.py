@@ -0,0 +1,165 @@
+import random
+from orchard import DEAD
+
+
+class TargetIndex:
+  """Trees an insect can fly to: watered and not dead.
+
+  The orchard keeps it up to date as trees are watered, die, revive and are
+  removed. Trees are bucketed on a coarse tile grid for nearest() and kept in
+  a Fenwick tree of weights for sample(), so neither query looks at every
+  tree. Serials of trees that stopped being targets pile up in lost until
+  take_lost(), for retargeting the insects still flying to them.
+  """
+
+  def __init__(self, columns, rows, tile_size, bucket_size=8):
+    self.tile_size = tile_size
+    self.bucket_size = bucket_size  # tiles per bucket side
+    self.bucket_columns = -(-columns // bucket_size)
+    self.bucket_rows = -(-rows // bucket_size)
+    self.buckets = {}  # (bucket_x, bucket_y) -> set of tiles
+    # Dense per-target lists; removal moves the last target into the hole
+    self.tiles = []
+    self.serials = []
+    self.weights = []
+    self.position = {}  # tile -> index into the lists
+    self.fenwick = [0.0]  # 1-based sums of weights, sized to a power of two
+    self.lost = []
+
+  def __len__(self):
+    return len(self.tiles)
+
+  def __contains__(self, tile):
+    return tile in self.position
+
+  # Fenwick tree over the weights
+
+  def _add_weight(self, position, delta):
+    i = position + 1
+    while i < len(self.fenwick):
+      self.fenwick[i] += delta
+      i += i & -i
+
+  def _rebuild_fenwick(self, size):
+    self.fenwick = [0.0] + self.weights + [0.0] * (size - len(self.weights))
+    for i in range(1, size + 1):
+      parent = i + (i & -i)
+      if parent <= size:
+        self.fenwick[parent] += self.fenwick[i]
+
+  def _prefix(self, count):
+    total = 0.0
+    while count > 0:
+      total += self.fenwick[count]
+      count -= count & -count
+    return total
+
+  # Updates
+
+  def _bucket(self, tile):
+    return tile[0] // self.bucket_size, tile[1] // self.bucket_size
+
+  def add(self, tile, serial, weight=1.0):
+    """Make the tree on tile (with serial) a target; weight sets how often sample() picks it."""
+    if tile in self.position:
+      self.discard(tile, lost=False)
+    position = len(self.tiles)
+    self.tiles.append(tile)
+    self.serials.append(serial)
+    self.weights.append(weight)
+    self.position[tile] = position
+    if position + 1 >= len(self.fenwick):
+      self._rebuild_fenwick(max(64, 2 * (len(self.fenwick) - 1)))
+    else:
+      self._add_weight(position, weight)
+    self.buckets.setdefault(self._bucket(tile), set()).add(tile)
+
+  def discard(self, tile, lost=True):
+    """The tree on tile is no longer a target (removed or dead); no-op if it wasn't one."""
+    position = self.position.pop(tile, None)
+    if position is None:
+      return
+    if lost:
+      self.lost.append(self.serials[position])
+    last = len(self.tiles) - 1
+    self._add_weight(position, -self.weights[position])
+    if position != last:
+      # Move the last target into the hole
+      self._add_weight(last, -self.weights[last])
+      self._add_weight(position, self.weights[last])
+      self.tiles[position] = self.tiles[last]
+      self.serials[position] = self.serials[last]
+      self.weights[position] = self.weights[last]
+      self.position[self.tiles[position]] = position
+    del self.tiles[last], self.serials[last], self.weights[last]
+    bucket = self.buckets[self._bucket(tile)]
+    bucket.discard(tile)
+    if not bucket:
+      del self.buckets[self._bucket(tile)]
+
+  def take_lost(self):
+    """Serials that stopped being targets since the last call."""
+    lost, self.lost = self.lost, []
+    return lost
+
+  def rebuild(self, orchard, order=None):
+    """Index the watered, living trees of orchard, in order (a list of serials) if given."""
+    n = orchard.count
+    targetable = orchard.growth_started[:n] & (orchard.status[:n] != DEAD)
+    slots = [int(slot) for slot in targetable.nonzero()[0]]
+    if order is not None:
+      rank = {serial: i for i, serial in enumerate(order)}
+      slots.sort(key=lambda slot: rank.get(int(orchard.serial[slot]), len(rank)))
+    self.buckets = {}
+    self.tiles, self.serials, self.weights, self.position = [], [], [], {}
+    self.fenwick = [0.0]
+    self.lost = []
+    for slot in slots:
+      self.add((int(orchard.tile_x[slot]), int(orchard.tile_y[slot])), int(orchard.serial[slot]))
+
+  # Queries
+
+  def sample(self, rng=random):
+    """A target tile picked at random in proportion to its weight, or None if there are none."""
+    if not self.tiles:
+      return None
+    target = rng.random() * self._prefix(len(self.tiles))
+    # Walk down the Fenwick tree to the first position whose prefix sum exceeds target
+    position = 0
+    step = (len(self.fenwick) - 1).bit_length() - 1
+    while step >= 0:
+      next_position = position + (1 << step)
+      if next_position < len(self.fenwick) and self.fenwick[next_position] <= target:
+        position = next_position
+        target -= self.fenwick[next_position]
+      step -= 1
+    return self.tiles[min(position, len(self.tiles) - 1)]
+
+  def nearest(self, x, y):
+    """The target tile whose centre is closest to the pixel (x, y), or None if there are none.
+
+    Searches rings of buckets outwards from (x, y) and stops once no further
+    ring could hold anything closer; ties go to the lowest tile.
+    """
+    if not self.tiles:
+      return None
+    size = self.tile_size
+    span = self.bucket_size * size
+    start_x = min(max(int(x // span), 0), self.bucket_columns - 1)
+    start_y = min(max(int(y // span), 0), self.bucket_rows - 1)
+    best = None
+    for ring in range(max(self.bucket_columns, self.bucket_rows)):
+      if best is not None and ((ring - 1) * span) ** 2 > best[0]:
+        break
+      for bucket_x in range(start_x - ring, start_x + ring + 1):
+        edge = abs(bucket_x - start_x) == ring
+        for bucket_y in range(start_y - ring, start_y + ring + 1):
+          if not edge and abs(bucket_y - start_y) != ring:
+            continue
+          for tile in self.buckets.get((bucket_x, bucket_y), ()):
+            dx = tile[0] * size + size / 2 - x
+            dy = tile[1] * size + size / 2 - y
+            candidate = (dx * dx + dy * dy, tile)
+            if best is None or candidate < best:
+              best = candidate
+    return best[1]
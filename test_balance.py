@@ -0,0 +1,18 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import balance
+
+
+def test_default_policy_results_vary_across_seeds():
+  # A policy that plays every seed the same can't tell one setting from another
+  rows = balance.play_batch({"total_time": 60000}, "farmer", range(6))
+  assert len({row[0] for row in rows}) > 1
+  assert len({row[4] for row in rows}) > 1
+
+
+def test_same_seed_plays_the_same_game():
+  assert balance.play_batch({"total_time": 30000}, "farmer", [3, 3])[0] == \
+         balance.play_batch({"total_time": 30000}, "farmer", [3])[0]
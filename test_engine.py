@@ -0,0 +1,35 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import assets
+from engine import GameState
+
+assets.set_headless()
+
+
+def edge_tiles(columns, rows):
+  """Every tile on the world's border, and the one just outside it, as (inside, outside) pairs."""
+  for x in range(columns):
+    yield (x, 0), (x, -1)
+    yield (x, rows - 1), (x, rows)
+  for y in range(rows):
+    yield (0, y), (-1, y)
+    yield (columns - 1, y), (columns, y)
+
+
+def test_plant_at_every_edge():
+  # Disease spread keeps the orchard's slot_grid raster, which off-world tiles used to overrun
+  game = GameState(disease_spread=True)
+  game.reset(seed=1)
+  orchard = game.orchard
+  for inside, outside in edge_tiles(game.columns, game.rows):
+    assert not game.plant(outside)
+    assert outside not in orchard
+    game.plant(inside)
+    assert inside in orchard
+  assert len(orchard) == 2 * (game.columns + game.rows) - 4
+  for tile, slot in orchard.index.items():
+    assert orchard.slot_grid[tile[1], tile[0]] == slot
+  assert (orchard.slot_grid >= 0).sum() == len(orchard)
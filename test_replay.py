@@ -0,0 +1,56 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import assets
+import snapshot
+from engine import GameState, Inputs, PLANT_KEY, WATER_KEY, PROTECT_KEY
+from replay import Recorder, Replay
+
+assets.set_headless()
+
+
+def scripted_inputs(frame):
+  held = [(pygame.K_w, pygame.K_d, pygame.K_s, pygame.K_a)[frame // 30 % 4]]
+  if frame % 45 == 0:
+    held.append(pygame.K_d)
+  pressed = [(PLANT_KEY, WATER_KEY, PROTECT_KEY)[frame // 20 % 3]] if frame % 20 == 0 else []
+  clicks = [(frame * 41 % 960, frame * 29 % 704)] if frame % 7 == 0 else []
+  return Inputs(held, pressed, clicks)
+
+
+def test_replay_rebuilds_the_recorded_session(tmp_path):
+  # Two rounds, with uneven frame lengths so the fixed timestep carries time over
+  path = str(tmp_path / "session.oqd")
+  game = GameState(disease_spread=True)
+  recorder = Recorder(path, game)
+  frame = 0
+  expected = []  # the game at the end of every round
+  for seed, total_time in [(7, 20000), (8, 60000)]:
+    if game.steps:
+      expected.append(snapshot.capture(game).pack())
+    recorder.round(seed, total_time)
+    game.reset(seed=seed, total_time=total_time)
+    recorder.start()
+    game.start()
+    for _ in range(900):
+      inputs, frame_ms = scripted_inputs(frame), 10 + frame % 4 * 7.5
+      recorder.frame(inputs, frame_ms)
+      game.step(inputs, frame_ms)
+      frame += 1
+  recorder.close()
+  assert len(game.orchard) and len(game.swarm)
+  expected.append(snapshot.capture(game).pack())
+
+  replay = Replay(path)
+  replayed = replay.new_game()
+  found = []
+  for event in replay:
+    if event[0] == "round" and replayed.steps:
+      found.append(snapshot.capture(replayed).pack())
+    replay.play(replayed, event)
+  found.append(snapshot.capture(replayed).pack())
+  assert found == expected
@@ -0,0 +1,41 @@
+from scheduler import Scheduler
+
+
+def test_due_events_fire_in_time_order_then_scheduling_order():
+  scheduler = Scheduler()
+  fired = []
+  for when, name in [(30, "c"), (10, "a"), (20, "b1"), (20, "b2"), (50, "late"), (20, "b3")]:
+    scheduler.schedule(when, fired.append, name)
+  assert scheduler.run_due(5) == 0
+  assert scheduler.run_due(30) == 5
+  assert fired == ["a", "b1", "b2", "b3", "c"]
+  assert len(scheduler) == 1
+
+
+def test_events_scheduled_while_running_fire_if_due():
+  scheduler = Scheduler()
+  fired = []
+
+  def chain(n):
+    fired.append(n)
+    scheduler.schedule(n + 10, chain, n + 10)
+
+  scheduler.schedule(0, chain, 0)
+  scheduler.run_due(25)
+  assert fired == [0, 10, 20]
+
+
+def test_cancelled_timers_never_fire():
+  scheduler = Scheduler()
+  fired = []
+  keep = scheduler.schedule(10, fired.append, "keep")
+  scheduler.schedule(10, fired.append, "drop").cancel()
+  assert scheduler.run_due(10) == 1
+  assert fired == ["keep"]
+  assert not keep.cancelled
+
+  pending = scheduler.schedule(20, fired.append, "cleared")
+  scheduler.clear()
+  assert pending.cancelled
+  assert scheduler.run_due(100) == 0
+  assert fired == ["keep"]
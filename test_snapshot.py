@@ -0,0 +1,76 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import pytest
+
+import assets
+import snapshot
+from engine import GameState, Inputs, PLANT_KEY, WATER_KEY, HARVEST_KEY
+
+assets.set_headless()
+
+
+def played_round():
+  game = GameState()
+  game.reset(seed=2)
+  for tile in [(3, 3), (4, 4)]:
+    game.plant(tile)
+    game.water(tile)
+  for _ in range(200):
+    game.step(Inputs(), 40)
+  return game
+
+
+def test_truncated_or_garbled_saves_raise_value_error():
+  data = snapshot.capture(played_round()).pack()
+  header = snapshot.HEADER.size
+  bad = [b"", data[:header - 1], data[:header], data[:header + 10], data[:len(data) // 2], data[:-1],
+         data[:header] + b"\x00" * (len(data) - header)]
+  for i in (0, header, header + 5, len(data) // 2, len(data) - 1):
+    flipped = bytearray(data)
+    flipped[i] ^= 0x40
+    bad.append(bytes(flipped))
+  for data in bad:
+    with pytest.raises(ValueError):
+      snapshot.Snapshot.unpack(data).restore(GameState())
+
+
+def test_restore_takes_disease_spread_from_the_save():
+  data = snapshot.capture(played_round()).pack()
+  game = GameState(disease_spread=True)
+  game.reset(seed=1)
+  snapshot.Snapshot.unpack(data).restore(game)
+  assert not game.disease_spread
+
+
+def scripted_inputs(frame):
+  """Walk in a square, planting, watering and harvesting along the way, and click now and then."""
+  held = [(pygame.K_d, pygame.K_s, pygame.K_a, pygame.K_w)[frame // 40 % 4]]
+  pressed = [(PLANT_KEY, WATER_KEY, HARVEST_KEY)[frame // 25 % 3]] if frame % 25 == 0 else []
+  clicks = [(frame * 37 % 960, frame * 53 % 704)] if frame % 11 == 0 else []
+  return Inputs(held, pressed, clicks)
+
+
+def test_restored_round_plays_on_like_the_original():
+  game = GameState(disease_spread=True)
+  game.reset(seed=5)
+  for frame in range(600):
+    game.step(scripted_inputs(frame), 16 + frame % 3 * 9)
+  data = snapshot.capture(game).pack()
+
+  # One after the other: both games draw from the shared random module
+  for frame in range(600, 1500):
+    game.step(scripted_inputs(frame), 16 + frame % 3 * 9)
+  assert len(game.orchard) and len(game.swarm)
+  expected = snapshot.capture(game).pack()
+
+  restored = GameState(disease_spread=True)
+  restored.reset(seed=99)
+  snapshot.Snapshot.unpack(data).restore(restored)
+  assert snapshot.capture(restored).pack() == data
+  for frame in range(600, 1500):
+    restored.step(scripted_inputs(frame), 16 + frame % 3 * 9)
+  assert snapshot.capture(restored).pack() == expected
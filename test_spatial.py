@@ -0,0 +1,50 @@
+import numpy as np
+
+from spatial import SpatialHash
+
+
+def assert_matches_rebuild(spatial, ids, x, y):
+  rebuilt = SpatialHash(960, 704, 64)
+  rebuilt.rebuild(ids, x, y)
+  assert spatial.count == len(ids)
+  assert (spatial.cells[:spatial.count] == rebuilt.cells[:rebuilt.count]).all()
+  assert spatial.buckets == rebuilt.buckets
+
+
+def test_buckets_match_a_rebuild_after_add_move_and_compact():
+  rng = np.random.default_rng(1)
+  spatial = SpatialHash(960, 704, 64)
+  ids = np.zeros(0, np.int64)
+  x = np.zeros(0, np.int64)
+  y = np.zeros(0, np.int64)
+  next_id = 0
+  for round in range(20):
+    # Spawn past the buffer's first doubling, some of it off screen
+    for _ in range(int(rng.integers(0, 40))):
+      px, py = (int(v) for v in rng.integers(-100, 1100, 2))
+      spatial.add(next_id, px, py)
+      ids, x, y = np.append(ids, next_id), np.append(x, px), np.append(y, py)
+      next_id += 1
+    x = x + rng.integers(-80, 81, len(x))
+    y = y + rng.integers(-80, 81, len(y))
+    spatial.move(ids, x, y)
+    assert_matches_rebuild(spatial, ids, x, y)
+
+    keep = np.flatnonzero(rng.random(len(ids)) < 0.8)
+    spatial.compact(ids, keep)
+    ids, x, y = ids[keep], x[keep], y[keep]
+    assert_matches_rebuild(spatial, ids, x, y)
+
+
+def test_query_finds_every_point_in_the_box():
+  rng = np.random.default_rng(2)
+  ids = np.arange(500)
+  x = rng.integers(-200, 1200, 500)
+  y = rng.integers(-200, 900, 500)
+  spatial = SpatialHash(960, 704, 64)
+  spatial.rebuild(ids, x, y)
+  for _ in range(50):
+    left, top = (int(v) for v in rng.integers(-300, 1000, 2))
+    right, bottom = left + int(rng.integers(0, 300)), top + int(rng.integers(0, 300))
+    inside = ids[(left <= x) & (x <= right) & (top <= y) & (y <= bottom)]
+    assert set(inside.tolist()) <= set(spatial.query(left, top, right, bottom).tolist())
@@ -0,0 +1,58 @@
+import random
+
+from targets import TargetIndex
+
+
+def random_index(rng, count, columns=60, rows=40):
+  index = TargetIndex(columns, rows, 64)
+  tiles = rng.sample([(x, y) for x in range(columns) for y in range(rows)], count)
+  for serial, tile in enumerate(tiles):
+    index.add(tile, serial)
+  return index
+
+
+def test_nearest_matches_brute_force():
+  rng = random.Random(1)
+  index = random_index(rng, 300)
+  for tile in rng.sample(index.tiles, 200):
+    index.discard(tile)
+  for _ in range(300):
+    x, y = rng.uniform(-500, 4500), rng.uniform(-500, 3000)
+    brute = min(((tx * 64 + 32 - x) ** 2 + (ty * 64 + 32 - y) ** 2, (tx, ty)) for tx, ty in index.tiles)
+    assert index.nearest(x, y) == brute[1]
+
+
+def test_nearest_and_sample_with_no_targets():
+  index = TargetIndex(10, 10, 64)
+  assert index.nearest(0, 0) is None
+  assert index.sample() is None
+
+
+def test_sample_follows_the_weights():
+  rng = random.Random(2)
+  index = TargetIndex(20, 20, 64)
+  weights = {(0, 0): 1.0, (5, 5): 3.0, (9, 2): 0.0, (19, 19): 6.0}
+  for serial, (tile, weight) in enumerate(weights.items()):
+    index.add(tile, serial, weight)
+  # Grow past the Fenwick tree's first size and back, so both the rebuild and the holes are covered
+  extra = [(x, 10) for x in range(20)] + [(x, 11) for x in range(20)] + [(x, 12) for x in range(20)]
+  for serial, tile in enumerate(extra, len(weights)):
+    index.add(tile, serial)
+  for tile in extra:
+    index.discard(tile)
+  counts = dict.fromkeys(weights, 0)
+  for _ in range(20000):
+    counts[index.sample(rng)] += 1
+  assert counts[(9, 2)] == 0
+  for tile, weight in weights.items():
+    assert abs(counts[tile] / 20000 - weight / 10) < 0.02
+
+
+def test_discarded_targets_are_reported_lost_once():
+  index = random_index(random.Random(3), 10)
+  tile, serial = index.tiles[4], index.serials[4]
+  index.discard(tile)
+  index.discard(tile)
+  assert tile not in index
+  assert index.take_lost() == [serial]
+  assert index.take_lost() == []
@@ -0,0 +1,85 @@
+import random
+from olive import infection_rate
+
+MIN_TEMPERATURE = 50
+MAX_TEMPERATURE = 100
+TEMPERATURE_DRIFT = 5  # standard deviation of each change, in °F
+
+# infection_rate() for every whole temperature the game can produce
+INFECTION_RATES = {}
+
+def refresh_infection_rates():
+  """Recompute INFECTION_RATES, e.g. after changing olive's infection constants."""
+  INFECTION_RATES.update((temperature, infection_rate(temperature))
+                         for temperature in range(MIN_TEMPERATURE, MAX_TEMPERATURE + 1))
+
+refresh_infection_rates()
+
+
+def generate_weighted_temperature(current_temp, rng=random, drift=TEMPERATURE_DRIFT):
+  """Generate a new temperature close to the current temperature."""
+  new_temp = round(rng.gauss(current_temp, drift))  # Normal distribution centered at current_temp
+  return max(MIN_TEMPERATURE, min(MAX_TEMPERATURE, new_temp))  # Keep within range
+
+
+def lookup_infection_rate(temperature):
+  rate = INFECTION_RATES.get(temperature)
+  return infection_rate(temperature) if rate is None else rate
+
+
+class Weather:
+  """Owns the temperature, drifts it every interval and tells subscribers when it changes."""
+
+  def __init__(self, interval=10000, temperature=None, now=0, drift=TEMPERATURE_DRIFT):
+    self.interval = interval  # milliseconds between drifts
+    self.drift = drift
+    self.listeners = []
+    self.reset(temperature, now)
+
+  def reset(self, temperature=None, now=0):
+    if temperature is None:
+      temperature = random.randint(MIN_TEMPERATURE, MAX_TEMPERATURE)
+    self.temperature = temperature
+    self.last_update = now
+    self.publish()
+
+  def subscribe(self, listener):
+    """Call listener(temperature, infection_rate) now and after every change."""
+    self.listeners.append(listener)
+    listener(self.temperature, self.infection_rate)
+
+  @property
+  def infection_rate(self):
+    return lookup_infection_rate(self.temperature)
+
+  def publish(self):
+    for listener in self.listeners:
+      listener(self.temperature, self.infection_rate)
+
+  def update(self, now):
+    """Drift the temperature once the interval is up; returns True if it changed."""
+    if now - self.last_update < self.interval:
+      return False
+    self.last_update = now  # Reset the timer
+    old = self.temperature
+    self.temperature = generate_weighted_temperature(self.temperature, drift=self.drift)  # Pick a new temperature
+    if self.temperature == old:
+      return False
+    self.publish()
+    return True
+
+  def forecast(self, days, seed, readings_per_day=24):
+    """Seeded multi-day outlook from the current temperature, one list of readings per day.
+
+    Uses its own random generator, so asking for a forecast never disturbs the game.
+    """
+    rng = random.Random(seed)
+    temperature = self.temperature
+    outlook = []
+    for day in range(days):
+      readings = []
+      for reading in range(readings_per_day):
+        temperature = generate_weighted_temperature(temperature, rng, self.drift)
+        readings.append(temperature)
+      outlook.append(readings)
+    return outlook